@@ -1,17 +1,50 @@
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse, PlainTextResponse, Response
 from pydantic import BaseModel
 
+import asyncio
+import cProfile
 import subprocess
 import sys
 import threading
 from pathlib import Path
 import json
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from functools import partial
+from typing import Literal
+
+# ingestion modules import each other as top-level scripts
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "ingestion"))
 
 from backend.status import read_status, write_status
+from backend.videos_cache import VideosCache
+from search_engine import Hit, bundle_file, group_by_video, hit_to_dict, load_bundle, load_segment_index
+from search_engine import profiling_enabled, save_profile
+from search_engine import search as run_query
+from metrics import REGISTRY, Stages, render_prometheus
+from storage import data_dir
+
+
+# search is CPU bound; it runs on its own small pool so that the default
+# threadpool (status, videos, prepare) is never starved by queued queries
+SEARCH_WORKERS = 2
+SEARCH_MAX_PENDING = 8
+
+search_executor = ThreadPoolExecutor(max_workers=SEARCH_WORKERS, thread_name_prefix="search")
+_search_pending = 0
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # opening the index snapshot is an mmap when it is current; a stale one
+    # is rebuilt on the search pool so startup itself never waits for it
+    search_executor.submit(load_segment_index)
+    yield
 
 
-app = FastAPI(title="YT Transcript Search Backend")
+app = FastAPI(title="YT Transcript Search Backend", lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -22,6 +55,7 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Total-Count"],
 )
 
 
@@ -30,24 +64,32 @@ def project_root() -> Path:
 
 
 def log_file() -> Path:
-    path = project_root() / "data" / "status" / "pipeline.log"
+    path = data_dir() / "status" / "pipeline.log"
     path.parent.mkdir(parents=True, exist_ok=True)
     return path
 
 
-def search_results_file() -> Path:
-    path = project_root() / "data" / "search_results" / "results.json"
-    path.parent.mkdir(parents=True, exist_ok=True)
-    return path
+def metrics_dir() -> Path:
+    return data_dir() / "metrics"
+
+
+def read_snapshot(path: Path) -> dict:
+    if not path.exists():
+        return {}
+
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except Exception:
+        return {}
 
 
 @app.get("/")
-def root():
+async def root():
     return {"message": "Backend running"}
 
 
 @app.get("/health")
-def health():
+async def health():
     return {"ok": True, "message": "Backend is running"}
 
 
@@ -98,75 +140,174 @@ def prepare(req: PrepareRequest):
 
 
 @app.get("/status")
-def get_status():
-    return read_status()
+async def get_status():
+    return await asyncio.to_thread(read_status)
 
 
-@app.get("/videos")
-def get_videos():
-    path = project_root() / "data" / "channel_videos" / "videos.json"
+def videos_file() -> Path:
+    return data_dir() / "channel_videos" / "videos.json"
 
-    if not path.exists():
-        return []
 
-    try:
-        return json.loads(path.read_text(encoding="utf-8"))
-    except Exception:
-        return []
+def videos_source() -> Path:
+    return bundle_file() or videos_file()
 
 
-@app.get("/search")
-def search(query: str = Query(..., min_length=1)):
-    root = project_root()
-    search_engine_path = root / "src" / "ingestion" / "search_engine.py"
+def read_videos(path: Path) -> list[dict]:
+    if path == bundle_file():
+        return load_bundle().videos()
+    return json.loads(path.read_text(encoding="utf-8"))
 
-    try:
-        proc = subprocess.run(
-            [sys.executable, str(search_engine_path), query],
-            cwd=str(root),
-            capture_output=True,
-            text=True
-        )
 
-        if proc.returncode != 0:
-            err = proc.stderr.strip() or proc.stdout.strip() or "Search failed"
-            return {
-                "ok": False,
-                "message": "Pretraga nije uspela.",
-                "error": err,
-                "query": query,
-                "count": 0,
-                "results": []
-            }
+videos_cache = VideosCache(videos_source, read_videos)
+
+
+def load_videos() -> list[dict]:
+    return videos_cache.videos()
+
+
+@app.get("/videos")
+async def get_videos(
+    request: Request,
+    offset: int = Query(0, ge=0),
+    limit: int | None = Query(None, ge=1, le=5000),
+    fields: str | None = None,
+):
+    selected = tuple(f.strip() for f in fields.split(",") if f.strip()) if fields else ()
+    body, etag, total = await asyncio.to_thread(videos_cache.view, offset, limit, selected)
+    headers = {"ETag": etag, "X-Total-Count": str(total), "Cache-Control": "no-cache"}
+
+    if etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+def grouped_response(
+    hits: list[Hit],
+    query: str,
+    mode: str,
+    order: str,
+    page: int,
+    page_size: int,
+    timestamps: int,
+) -> dict:
+    groups = group_by_video(hits, load_videos(), order=order, max_timestamps=timestamps)
+    start = (page - 1) * page_size
+
+    return {
+        "ok": True,
+        "message": "Pretraga završena.",
+        "query": query,
+        "mode": mode,
+        "count": len(hits),
+        "group": "video",
+        "order": order,
+        "page": page,
+        "page_size": page_size,
+        "video_count": len(groups),
+        "results": groups[start:start + page_size]
+    }
 
-        results_path = search_results_file()
 
-        if not results_path.exists():
-            return {
-                "ok": True,
-                "message": "Nema rezultata.",
+@app.get("/search")
+async def search(
+    query: str = Query(..., min_length=1),
+    mode: Literal["auto", "fuzzy", "semantic"] = "auto",
+    group: bool = False,
+    order: Literal["hits", "recent"] = "hits",
+    page: int = Query(1, ge=1),
+    page_size: int = Query(20, ge=1, le=200),
+    timestamps: int = Query(3, ge=0, le=50),
+    profile: bool = False,
+):
+    global _search_pending
+
+    if _search_pending >= SEARCH_MAX_PENDING:
+        REGISTRY.inc("backend_search_rejected_total")
+        return JSONResponse(
+            status_code=429,
+            headers={"Retry-After": "1"},
+            content={
+                "ok": False,
+                "message": "Previše istovremenih pretraga, pokušajte ponovo.",
                 "query": query,
                 "count": 0,
                 "results": []
             }
+        )
 
-        data = json.loads(results_path.read_text(encoding="utf-8"))
+    _search_pending += 1
+    try:
+        loop = asyncio.get_running_loop()
+        with REGISTRY.timer("backend_search_seconds"):
+            response = await loop.run_in_executor(
+                search_executor,
+                partial(run_search, query, mode, group, order, page, page_size, timestamps, profile),
+            )
+    finally:
+        _search_pending -= 1
+
+    REGISTRY.inc("backend_search_requests_total", ok=response["ok"])
+    return response
+
+
+def run_search(
+    query: str,
+    mode: str,
+    group: bool,
+    order: str,
+    page: int,
+    page_size: int,
+    timestamps: int,
+    profile: bool,
+) -> dict:
+    stages = Stages()
+    profile_path = None
 
-        return {
-            "ok": True,
-            "message": "Pretraga završena.",
-            "query": data.get("query", query),
-            "mode": data.get("mode", "unknown"),
-            "count": data.get("count", 0),
-            "results": data.get("results", [])
-        }
+    try:
+        if profile and profiling_enabled():
+            profiler = cProfile.Profile()
+            hits, matched = profiler.runcall(run_query, query, mode, stages)
+            profile_path = save_profile(profiler)
+        else:
+            hits, matched = run_query(query, mode, stages)
+
+        with stages.time("serialize"):
+            if group:
+                response = grouped_response(hits, query, matched, order, page, page_size, timestamps)
+            else:
+                response = {
+                    "ok": True,
+                    "message": "Pretraga završena." if hits else "Nema rezultata.",
+                    "query": query,
+                    "mode": matched,
+                    "count": len(hits),
+                    "results": [hit_to_dict(h) for h in hits]
+                }
+
+        stages.observe("search")
+        REGISTRY.inc("search_queries_total", mode=matched)
+        REGISTRY.inc("search_hits_total", len(hits))
+
+        if profile_path:
+            response["profile"] = str(profile_path)
+
+        return response
 
     except Exception as e:
         return {
             "ok": False,
-            "message": "Greška pri pokretanju search engine-a.",
+            "message": "Greška pri pretrazi.",
             "error": str(e),
             "query": query,
             "count": 0,
             "results": []
-        }
\ No newline at end of file
+        }
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def get_metrics():
+    return render_prometheus(
+        REGISTRY.snapshot(),
+        read_snapshot(metrics_dir() / "pipeline.json"),
+    )
@@ -1,13 +1,17 @@
 import json
+import sys
 from pathlib import Path
 
+# ingestion modules import each other as top-level scripts
+_INGESTION_DIR = str(Path(__file__).resolve().parents[1] / "src" / "ingestion")
+if _INGESTION_DIR not in sys.path:
+    sys.path.insert(0, _INGESTION_DIR)
 
-def project_root() -> Path:
-    return Path(__file__).resolve().parents[1]
+from storage import data_dir
 
 
 def status_file() -> Path:
-    status_dir = project_root() / "data" / "status"
+    status_dir = data_dir() / "status"
     status_dir.mkdir(parents=True, exist_ok=True)
     return status_dir / "current_status.json"
 
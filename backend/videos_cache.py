@@ -0,0 +1,77 @@
+import hashlib
+import json
+import threading
+from pathlib import Path
+from typing import Callable
+
+
+class VideosCache:
+    """Keeps the parsed videos.json in memory and reloads it only when the
+    file's mtime or size changes. Serialized responses are cached per
+    (offset, limit, fields) view together with their ETag."""
+
+    MAX_VIEWS = 64
+
+    def __init__(self, path: Callable[[], Path], load: Callable[[Path], list] | None = None):
+        self._path = path
+        self._load = load or (lambda p: json.loads(p.read_text(encoding="utf-8")))
+        self._lock = threading.Lock()
+        self._stamp: tuple[int, int] | None = None
+        self._videos: list[dict] = []
+        self._views: dict[tuple, tuple[bytes, str]] = {}
+
+    def _current_stamp(self) -> tuple[int, int] | None:
+        try:
+            st = self._path().stat()
+        except FileNotFoundError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def _refresh(self) -> tuple[int, int] | None:
+        stamp = self._current_stamp()
+        if stamp == self._stamp:
+            return stamp
+
+        videos: list[dict] = []
+        if stamp is not None:
+            try:
+                videos = self._load(self._path())
+            except Exception:
+                videos = []
+
+        self._stamp = stamp
+        self._videos = videos if isinstance(videos, list) else []
+        self._views.clear()
+        return stamp
+
+    def videos(self) -> list[dict]:
+        with self._lock:
+            self._refresh()
+            return self._videos
+
+    def view(
+        self,
+        offset: int = 0,
+        limit: int | None = None,
+        fields: tuple[str, ...] = (),
+    ) -> tuple[bytes, str, int]:
+        """Returns (json body, etag, total count) for a page of the list."""
+        with self._lock:
+            stamp = self._refresh()
+            key = (offset, limit, fields)
+            cached = self._views.get(key)
+
+            if cached is None:
+                items = self._videos[offset:None if limit is None else offset + limit]
+                if fields:
+                    items = [{f: v.get(f) for f in fields} for v in items]
+
+                body = json.dumps(items, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+                tag = hashlib.sha1(repr((stamp, key)).encode("utf-8")).hexdigest()[:16]
+                cached = (body, f'W/"{tag}"')
+
+                if len(self._views) >= self.MAX_VIEWS:
+                    self._views.clear()
+                self._views[key] = cached
+
+            return cached[0], cached[1], len(self._videos)
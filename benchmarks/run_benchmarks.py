@@ -0,0 +1,190 @@
+import argparse
+import json
+import os
+import platform
+import resource
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[1]
+sys.path.insert(0, str(ROOT / "src" / "ingestion"))
+sys.path.insert(0, str(ROOT))
+
+from synthetic_corpus import EXACT_QUERY, FORMS_QUERY, FUZZY_QUERY, MISS_QUERY, generate
+
+
+QUERIES = {
+    "exact": (EXACT_QUERY, "auto"),
+    "forms": (FORMS_QUERY, "auto"),
+    "miss": (MISS_QUERY, "auto"),
+    "fuzzy": (FUZZY_QUERY, "fuzzy"),
+}
+
+
+def percentiles(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+
+    def pct(p: float) -> float:
+        idx = min(len(ordered) - 1, int(round(p / 100 * (len(ordered) - 1))))
+        return round(ordered[idx] * 1000, 3)
+
+    return {
+        "n": len(ordered),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 3),
+        "p50_ms": pct(50),
+        "p90_ms": pct(90),
+        "p99_ms": pct(99),
+        "max_ms": round(ordered[-1] * 1000, 3),
+    }
+
+
+def timed(fn, repeat: int) -> list[float]:
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - t0)
+    return samples
+
+
+def corpus_bytes(data_dir: Path) -> int:
+    return sum(p.stat().st_size for p in (data_dir / "transcripts").iterdir())
+
+
+def reset_caches(search_engine) -> None:
+    search_engine._GENERATION = (None, "")
+    search_engine._REBUILDING = False
+    search_engine._SEGMENT_INDEX = None
+    search_engine._FUZZY_INDEX = None
+
+
+def bench_index(search_engine) -> dict:
+    shutil.rmtree(search_engine.index_dir(), ignore_errors=True)
+    reset_caches(search_engine)
+
+    tracemalloc.start()
+    t0 = time.perf_counter()
+    index = search_engine.load_segment_index()
+    build_s = time.perf_counter() - t0
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    snapshot = search_engine.segment_index_file(index.generation)
+
+    reset_caches(search_engine)
+    t0 = time.perf_counter()
+    search_engine.load_segment_index()
+    open_s = time.perf_counter() - t0
+
+    # the snapshot build also wrote the fuzzy index; time it on its own
+    search_engine.fuzzy_index_file().unlink()
+    search_engine._FUZZY_INDEX = None
+    t0 = time.perf_counter()
+    search_engine.load_fuzzy_index()
+    fuzzy_build_s = time.perf_counter() - t0
+
+    search_engine._FUZZY_INDEX = None
+    t0 = time.perf_counter()
+    search_engine.load_fuzzy_index()
+    fuzzy_load_s = time.perf_counter() - t0
+
+    return {
+        "segments": len(index),
+        "index_build_s": round(build_s, 4),
+        "index_build_peak_bytes": peak,
+        "snapshot_open_s": round(open_s, 4),
+        "snapshot_bytes": snapshot.stat().st_size,
+        "fuzzy_build_s": round(fuzzy_build_s, 4),
+        "fuzzy_load_s": round(fuzzy_load_s, 4),
+        "fuzzy_file_bytes": search_engine.fuzzy_index_file().stat().st_size,
+    }
+
+
+def bench_queries(search_engine, repeat: int) -> dict:
+    out = {}
+    for name, (query, mode) in QUERIES.items():
+        hits, matched = search_engine.search(query, mode)
+        samples = timed(lambda: search_engine.search(query, mode), repeat)
+        out[name] = {"query": query, "mode": matched, "hits": len(hits), **percentiles(samples)}
+
+    tracemalloc.start()
+    search_engine.search(MISS_QUERY)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    out["miss_peak_bytes"] = peak
+    return out
+
+
+def bench_http(repeat: int) -> dict | None:
+    try:
+        from fastapi.testclient import TestClient
+    except ImportError:
+        return None
+
+    from backend.main import app
+
+    client = TestClient(app)
+    out = {}
+    for name, (query, mode) in QUERIES.items():
+        params = {"query": query, "mode": mode}
+        client.get("/search", params=params)
+        samples = timed(lambda: client.get("/search", params=params), repeat)
+        out[name] = percentiles(samples)
+    return out
+
+
+def run(videos: int, segments: int, repeat: int, http_repeat: int, seed: int, compressed: bool) -> dict:
+    with tempfile.TemporaryDirectory(prefix="yts-bench-") as tmp:
+        data_dir = Path(tmp) / "data"
+        t0 = time.perf_counter()
+        generate(data_dir, videos, segments, seed=seed, compressed=compressed)
+        gen_s = time.perf_counter() - t0
+
+        os.environ["YT_SEARCH_DATA_DIR"] = str(data_dir)
+        import search_engine
+
+        result = {
+            "videos": videos,
+            "segments_per_video": segments,
+            "compressed": compressed,
+            "corpus_bytes": corpus_bytes(data_dir),
+            "generate_s": round(gen_s, 3),
+            "index": bench_index(search_engine),
+            "search": bench_queries(search_engine, repeat),
+            "http": bench_http(http_repeat),
+            "max_rss_kb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss,
+        }
+
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Search benchmarks on a synthetic corpus.")
+    parser.add_argument("--videos", type=int, nargs="+", default=[100])
+    parser.add_argument("--segments", type=int, default=120)
+    parser.add_argument("--repeat", type=int, default=10)
+    parser.add_argument("--http-repeat", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--compressed", action="store_true")
+    parser.add_argument("--output", type=Path, default=None)
+    args = parser.parse_args()
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "runs": [run(n, args.segments, args.repeat, args.http_repeat, args.seed, args.compressed) for n in args.videos],
+    }
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.write_text(text, encoding="utf-8")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
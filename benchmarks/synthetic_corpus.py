@@ -0,0 +1,179 @@
+import argparse
+import json
+import random
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "ingestion"))
+
+import storage
+
+
+STEMS = [
+    "inflacij", "ekonomij", "politik", "vlad", "izbor", "drzav", "skol",
+    "bolnic", "porez", "plat", "penzij", "struj", "cen", "banc", "kredit",
+    "gradjan", "opstin", "pravd", "sud", "zakon", "ustav", "granic",
+    "sport", "utakmic", "reprezentacij", "muzik", "pesm", "film", "knjig",
+    "istorij", "nauk", "tehnologij", "internet", "telefon", "automobil",
+]
+
+NOUN_SUFFIXES = ["a", "e", "i", "u"]
+
+FILLER = [
+    "i", "a", "ali", "da", "je", "su", "smo", "ste", "to", "ovo", "ono",
+    "kako", "zašto", "gde", "kada", "danas", "sutra", "juče", "mnogo",
+    "malo", "veoma", "naravno", "dakle", "znači", "pričamo", "govorimo",
+    "mislim", "vidimo", "čujemo", "imamo", "nemamo", "može", "treba",
+    "važno", "veliki", "mali", "novi", "stari", "dobar", "loš",
+]
+
+CYRILLIC = str.maketrans({
+    "a": "а", "b": "б", "v": "в", "g": "г", "d": "д", "e": "е", "z": "з",
+    "i": "и", "j": "ј", "k": "к", "l": "л", "m": "м", "n": "н", "o": "о",
+    "p": "п", "r": "р", "s": "с", "t": "т", "u": "у", "f": "ф", "h": "х",
+    "c": "ц", "č": "ч", "ć": "ћ", "š": "ш", "ž": "ж", "đ": "ђ",
+})
+
+# stems whose "ama" form is never generated, so "<stem>ama" is an exact
+# miss that the forms pattern still finds
+FORMS_QUERY = "inflacijama"
+EXACT_QUERY = "ekonomija"
+MISS_QUERY = "kvantnahromodinamika"
+FUZZY_QUERY = "ekonomjia"
+
+
+def random_sentence(rng: random.Random, words: int) -> str:
+    out = []
+    for _ in range(words):
+        if rng.random() < 0.3:
+            out.append(rng.choice(STEMS) + rng.choice(NOUN_SUFFIXES))
+        else:
+            out.append(rng.choice(FILLER))
+    out[0] = out[0].capitalize()
+    return " ".join(out)
+
+
+def youtube_list(rng: random.Random, segments: int, cyrillic: bool) -> list[dict]:
+    items = []
+    t = 0.0
+    for _ in range(segments):
+        dur = round(rng.uniform(1.5, 6.0), 3)
+        text = random_sentence(rng, rng.randint(4, 12))
+        if cyrillic:
+            text = text.lower().translate(CYRILLIC)
+        items.append({"text": text, "start": round(t, 3), "duration": dur})
+        t += dur
+    return items
+
+
+def whisper_payload(rng: random.Random, video_id: str, segments: int) -> dict:
+    segs = []
+    t = 0.0
+    for i in range(segments):
+        words = random_sentence(rng, rng.randint(8, 30)).split()
+        start = t
+        word_items = []
+        for w in words:
+            dur = rng.uniform(0.15, 0.6)
+            word_items.append({
+                "word": f" {w}",
+                "start": round(t, 2),
+                "end": round(t + dur, 2),
+                "probability": round(rng.uniform(0.4, 1.0), 3),
+            })
+            t += dur
+        text = " " + " ".join(words)
+        segs.append({
+            "id": i,
+            "seek": int(start * 100),
+            "start": round(start, 2),
+            "end": round(t, 2),
+            "text": text,
+            "tokens": [rng.randint(0, 50000) for _ in range(len(words) + 2)],
+            "temperature": 0.0,
+            "avg_logprob": round(rng.uniform(-0.8, -0.1), 4),
+            "compression_ratio": round(rng.uniform(1.0, 2.0), 4),
+            "no_speech_prob": round(rng.uniform(0.0, 0.2), 4),
+            "words": word_items,
+        })
+
+    return {
+        "video_id": video_id,
+        "source": "whisper",
+        "model": "medium",
+        "language_forced": "sr",
+        "audio": {"mp3": f"data/audio/{video_id}.mp3"},
+        "text": "".join(s["text"] for s in segs).strip(),
+        "segments": segs,
+    }
+
+
+def generate(
+    out_dir: Path,
+    videos: int,
+    segments: int = 120,
+    whisper_ratio: float = 0.3,
+    cyrillic_ratio: float = 0.1,
+    seed: int = 1,
+    compressed: bool = False,
+) -> Path:
+    """Writes a synthetic data/ tree (transcripts and videos.json) under out_dir."""
+    rng = random.Random(seed)
+    transcripts = out_dir / "transcripts"
+    transcripts.mkdir(parents=True, exist_ok=True)
+    channel = out_dir / "channel_videos"
+    channel.mkdir(parents=True, exist_ok=True)
+
+    meta = []
+    for i in range(videos):
+        video_id = f"syn{i:08d}"
+        n = max(1, int(rng.gauss(segments, segments / 4)))
+
+        if rng.random() < whisper_ratio:
+            data = whisper_payload(rng, video_id, n)
+        else:
+            data = youtube_list(rng, n, rng.random() < cyrillic_ratio)
+
+        if compressed:
+            storage.write_transcript(transcripts, video_id, data)
+        else:
+            (transcripts / f"{video_id}.json").write_text(
+                json.dumps(data, ensure_ascii=False, indent=2),
+                encoding="utf-8"
+            )
+
+        meta.append({
+            "video_id": video_id,
+            "title": random_sentence(rng, 6),
+            "duration": rng.randint(60, 7200),
+            "thumbnail": f"https://i.ytimg.com/vi/{video_id}/hqdefault.jpg",
+            "url": f"https://www.youtube.com/watch?v={video_id}",
+        })
+
+    (channel / "videos.json").write_text(
+        json.dumps(meta, ensure_ascii=False, indent=2),
+        encoding="utf-8"
+    )
+    return out_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Generate a synthetic Serbian transcript corpus.")
+    parser.add_argument("out_dir", type=Path)
+    parser.add_argument("--videos", type=int, default=100)
+    parser.add_argument("--segments", type=int, default=120)
+    parser.add_argument("--whisper-ratio", type=float, default=0.3)
+    parser.add_argument("--cyrillic-ratio", type=float, default=0.1)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--compressed", action="store_true")
+    args = parser.parse_args()
+
+    generate(
+        args.out_dir, args.videos, args.segments,
+        args.whisper_ratio, args.cyrillic_ratio, args.seed, args.compressed,
+    )
+    print(f"Generated {args.videos} videos in {args.out_dir}")
+
+
+if __name__ == "__main__":
+    main()
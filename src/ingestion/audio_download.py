@@ -1,10 +1,10 @@
 import subprocess
 import sys
-from pathlib import Path
+
+import storage
 
 def download_audio(video_id: str) -> tuple[bool, str | None]:
-    repo_root = Path(__file__).resolve().parents[2]
-    out_dir = repo_root / "data" / "audio"
+    out_dir = storage.data_dir() / "audio"
     out_dir.mkdir(parents=True, exist_ok=True)
     out_path = out_dir / f"{video_id}.mp3"
 
@@ -25,7 +25,7 @@ def download_audio(video_id: str) -> tuple[bool, str | None]:
         "--retry-sleep", "fragment:5",
 
         "--limit-rate", "750K",
-        "--cookies", str(repo_root / "data" / "cookies" / "cookies.txt"),
+        "--cookies", str(storage.data_dir() / "cookies" / "cookies.txt"),
 
 
         "-x", "--audio-format", "mp3",
@@ -0,0 +1,282 @@
+import json
+import mmap
+import struct
+import sys
+import tempfile
+import time
+import zipfile
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set
+
+import storage
+from fuzzy_index import FuzzyIndex
+from segment_index import SegmentIndex
+from search_engine import (
+    corpus_generation,
+    data_dir,
+    files_generation,
+    fuzzy_index_file,
+    iter_corpus_segments,
+    iter_transcript_files,
+    refresh_segment_index,
+    segment_index_file,
+    semantic_index_dir,
+    transcripts_dir,
+)
+
+
+BUNDLE_FORMAT = "yt-transcript-search-bundle"
+BUNDLE_VERSION = 1
+
+MANIFEST = "manifest.json"
+VIDEOS = "videos.json"
+SEGMENTS = "index/segments.idx"
+FUZZY = "index/fuzzy_index.json"
+SEMANTIC = "index/semantic/"
+TRANSCRIPTS = "transcripts/"
+
+# stored members start on this boundary so they can be mapped in place
+_ALIGN = 8
+# extra field id zipalign uses for padding; unzip tools skip it
+_PAD_ID = 0xD935
+_LOCAL_HEADER = struct.Struct("<4s5H3I2H")
+
+
+def videos_file() -> Path:
+    return data_dir() / "channel_videos" / "videos.json"
+
+
+def _stored_info(zf: zipfile.ZipFile, name: str, size: int) -> zipfile.ZipInfo:
+    info = zipfile.ZipInfo(name, date_time=time.localtime()[:6])
+    info.compress_type = zipfile.ZIP_STORED
+    info.file_size = size
+
+    data_at = zf.fp.tell() + _LOCAL_HEADER.size + len(name.encode("utf-8")) + 4
+    pad = -data_at % _ALIGN
+    info.extra = struct.pack("<HH", _PAD_ID, pad) + b"\0" * pad
+    return info
+
+
+def _write_stored(zf: zipfile.ZipFile, name: str, path: Path) -> None:
+    info = _stored_info(zf, name, path.stat().st_size)
+    with zf.open(info, "w") as out, open(path, "rb") as f:
+        while chunk := f.read(1 << 20):
+            out.write(chunk)
+
+
+def channel_video_ids() -> Optional[Set[str]]:
+    try:
+        videos = json.loads(videos_file().read_text(encoding="utf-8"))
+    except Exception:
+        return None
+    return {v["video_id"] for v in videos if v.get("video_id")}
+
+
+def export_bundle(out_path: Path, channel: str = "") -> Dict[str, Any]:
+    """Packs the transcripts of the videos in videos.json, the file itself
+    and their indexes into one file; without videos.json the whole corpus."""
+    segments = refresh_segment_index()
+    transcripts = iter_transcript_files()
+
+    ids = channel_video_ids()
+    if ids is not None:
+        transcripts = [p for p in transcripts if storage.video_id_of(p) in ids]
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_path.with_name(out_path.name + ".tmp")
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        segments_path = segment_index_file(segments.generation)
+        fuzzy_path = fuzzy_index_file()
+        semantic_dir = semantic_index_dir(segments.generation)
+
+        if [storage.video_id_of(p) for p in transcripts] != segments.videos:
+            # the corpus holds other channels too, so this one gets its own
+            # indexes; the semantic one is only reused for the whole corpus
+            generation = files_generation(transcripts)
+            segments_path = Path(tmpdir) / "segments.idx"
+            header, sections = SegmentIndex.build(generation, iter_corpus_segments(transcripts))
+            SegmentIndex.write(segments_path, header, sections)
+            segments = SegmentIndex.from_buffer(memoryview(segments_path.read_bytes()))
+
+            fuzzy_path = Path(tmpdir) / "fuzzy_index.json"
+            FuzzyIndex.build(generation, segments.iter_video_texts()).save(fuzzy_path)
+            semantic_dir = None
+
+        has_semantic = semantic_dir is not None and (semantic_dir / "header.json").exists()
+
+        manifest = {
+            "format": BUNDLE_FORMAT,
+            "version": BUNDLE_VERSION,
+            "channel": channel,
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "generation": segments.generation,
+            "videos": len(segments.videos),
+            "segments": len(segments),
+            "transcripts": len(transcripts),
+            "semantic": has_semantic,
+        }
+
+        with zipfile.ZipFile(tmp, "w", compression=zipfile.ZIP_DEFLATED) as zf:
+            zf.writestr(MANIFEST, json.dumps(manifest, ensure_ascii=False, indent=2))
+            if videos_file().exists():
+                zf.write(videos_file(), VIDEOS)
+
+            _write_stored(zf, SEGMENTS, segments_path)
+            zf.write(fuzzy_path, FUZZY)
+
+            if has_semantic:
+                for p in sorted(semantic_dir.iterdir()):
+                    _write_stored(zf, SEMANTIC + p.name, p)
+
+            # compressed transcripts gain nothing from deflate
+            for p in transcripts:
+                if p.suffix == ".json":
+                    zf.write(p, TRANSCRIPTS + p.name)
+                else:
+                    _write_stored(zf, TRANSCRIPTS + p.name, p)
+
+    tmp.replace(out_path)
+    return manifest
+
+
+def _member_offset(f, info: zipfile.ZipInfo) -> int:
+    f.seek(info.header_offset)
+    fields = _LOCAL_HEADER.unpack(f.read(_LOCAL_HEADER.size))
+    if fields[0] != b"PK\x03\x04":
+        raise ValueError(f"Neispravan zip član: {info.filename}")
+    name_len, extra_len = fields[-2], fields[-1]
+    return info.header_offset + _LOCAL_HEADER.size + name_len + extra_len
+
+
+class Bundle:
+    """Read-only view of an exported bundle. The segment index is mapped
+    straight out of the bundle file, nothing is unpacked."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._zip = zipfile.ZipFile(path)
+        self.manifest: Dict[str, Any] = json.loads(self._zip.read(MANIFEST))
+
+        if self.manifest.get("format") != BUNDLE_FORMAT or self.manifest.get("version") != BUNDLE_VERSION:
+            raise ValueError(f"Nepodržan bundle: {path}")
+
+        self._mmap: Optional[mmap.mmap] = None
+        self._segments: Optional[SegmentIndex] = None
+        self._fuzzy: Optional[FuzzyIndex] = None
+
+    @property
+    def generation(self) -> str:
+        return self.manifest["generation"]
+
+    def read(self, name: str) -> bytes:
+        return self._zip.read(name)
+
+    def videos(self) -> List[dict]:
+        try:
+            return json.loads(self.read(VIDEOS))
+        except KeyError:
+            return []
+
+    def segment_index(self) -> SegmentIndex:
+        if self._segments is None:
+            info = self._zip.getinfo(SEGMENTS)
+            if info.compress_type != zipfile.ZIP_STORED:
+                raise ValueError(f"Indeks u bundle-u je kompresovan: {self.path}")
+
+            with open(self.path, "rb") as f:
+                offset = _member_offset(f, info)
+                self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+            buf = memoryview(self._mmap)[offset:offset + info.file_size]
+            # a bundle from another zip tool may not keep the alignment
+            if offset % _ALIGN:
+                buf = memoryview(bytes(buf))
+
+            index = SegmentIndex.from_buffer(buf, owner=self._mmap)
+            if index is None:
+                raise ValueError(f"Neispravan indeks u bundle-u: {self.path}")
+            self._segments = index
+        return self._segments
+
+    def fuzzy_index(self) -> FuzzyIndex:
+        if self._fuzzy is None:
+            index = FuzzyIndex.loads(self.read(FUZZY).decode("utf-8"))
+            if index is None:
+                raise ValueError(f"Neispravan fuzzy indeks u bundle-u: {self.path}")
+            self._fuzzy = index
+        return self._fuzzy
+
+    def members(self, prefix: str) -> List[zipfile.ZipInfo]:
+        return [i for i in self._zip.infolist() if i.filename.startswith(prefix) and not i.is_dir()]
+
+
+def import_bundle(path: Path) -> Dict[str, Any]:
+    """Unpacks a bundle into the data directory. The bundled indexes are
+    re-stamped for the unpacked transcripts instead of being rebuilt."""
+    bundle = Bundle(path)
+    out = transcripts_dir()
+    out.mkdir(parents=True, exist_ok=True)
+
+    for info in bundle.members(TRANSCRIPTS):
+        name = Path(info.filename).name
+        tmp = out / (name + ".tmp")
+        tmp.write_bytes(bundle.read(info.filename))
+        tmp.replace(out / name)
+
+    if bundle.members(VIDEOS):
+        videos_file().parent.mkdir(parents=True, exist_ok=True)
+        videos_file().write_bytes(bundle.read(VIDEOS))
+
+    # file mtimes are part of the generation, so it changes on unpack
+    generation = corpus_generation()
+    same_corpus = [storage.video_id_of(p) for p in iter_transcript_files()] == bundle.segment_index().videos
+
+    if same_corpus:
+        bundle.segment_index().save_as(segment_index_file(generation), generation)
+
+        fuzzy = bundle.fuzzy_index()
+        fuzzy.generation = generation
+        fuzzy.save(fuzzy_index_file())
+
+        semantic = bundle.members(SEMANTIC)
+        if semantic:
+            out_dir = semantic_index_dir(generation)
+            out_dir.mkdir(parents=True, exist_ok=True)
+            # header.json marks a complete index, so it goes last
+            for info in sorted(semantic, key=lambda i: i.filename.endswith("header.json")):
+                blob = bundle.read(info.filename)
+                if info.filename.endswith("header.json"):
+                    header = json.loads(blob)
+                    header["generation"] = generation
+                    blob = json.dumps(header, ensure_ascii=False).encode("utf-8")
+                (out_dir / Path(info.filename).name).write_bytes(blob)
+
+    # with other transcripts already present the next search rebuilds
+    refresh_segment_index()
+    return {**bundle.manifest, "generation": generation, "reused_index": same_corpus}
+
+
+def main():
+    usage = (
+        "Upotreba:\n"
+        "  python src/ingestion/bundle.py export <izlaz.ytsb> [kanal]\n"
+        "  python src/ingestion/bundle.py import <ulaz.ytsb>"
+    )
+    if len(sys.argv) < 3 or sys.argv[1] not in ("export", "import"):
+        print(usage)
+        sys.exit(1)
+
+    path = Path(sys.argv[2])
+    if sys.argv[1] == "export":
+        manifest = export_bundle(path, sys.argv[3] if len(sys.argv) > 3 else "")
+        print(f"Bundle {path}: {manifest['videos']} videa, {manifest['segments']} segmenata, "
+              f"{path.stat().st_size / 1e6:.1f} MB")
+    else:
+        manifest = import_bundle(path)
+        print(f"Uvezeno {manifest['transcripts']} transkripata u {data_dir()}"
+              + ("" if manifest["reused_index"] else " (indeks će biti ponovo izgrađen)"))
+
+
+if __name__ == "__main__":
+    main()
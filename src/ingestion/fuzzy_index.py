@@ -0,0 +1,165 @@
+import json
+import re
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, List, Set, Tuple
+
+
+INDEX_VERSION = 4
+
+WORD_RE = re.compile(r"\w+")
+
+
+def trigrams(term: str) -> Set[str]:
+    padded = f"  {term} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str, max_edits: int) -> int:
+    """Levenshtein distance between a and b, capped at max_edits + 1."""
+    if abs(len(a) - len(b)) > max_edits:
+        return max_edits + 1
+
+    prev = list(range(len(b) + 1))
+    for i, ca in enumerate(a, start=1):
+        cur = [i] + [0] * len(b)
+        row_min = i
+        for j, cb in enumerate(b, start=1):
+            cur[j] = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + (ca != cb))
+            if cur[j] < row_min:
+                row_min = cur[j]
+        if row_min > max_edits:
+            return max_edits + 1
+        prev = cur
+
+    return min(prev[-1], max_edits + 1)
+
+
+def default_max_edits(term: str) -> int:
+    if len(term) <= 3:
+        return 0
+    if len(term) <= 6:
+        return 1
+    return 2
+
+
+class FuzzyIndex:
+    """Term dictionary of the corpus with per-term video postings and a
+    trigram index over the terms, used to find near matches of a query word
+    without scanning every transcript."""
+
+    def __init__(
+        self,
+        generation: str,
+        videos: List[str],
+        terms: List[str],
+        postings: List[List[int]],
+        grams: Dict[str, List[int]],
+    ):
+        self.generation = generation
+        self.videos = videos
+        self.terms = terms
+        self.postings = postings
+        self.grams = grams
+        self._term_ids: Dict[str, int] | None = None
+
+    @classmethod
+    def build(cls, generation: str, corpus: Iterable[Tuple[str, Iterable[str]]]) -> "FuzzyIndex":
+        """Builds the index from (video_id, normalized texts) pairs."""
+        videos: List[str] = []
+        term_ids: Dict[str, int] = {}
+        postings: List[List[int]] = []
+
+        for video_id, texts in corpus:
+            vidx = len(videos)
+            videos.append(video_id)
+            seen: Set[str] = set()
+            for text in texts:
+                seen.update(WORD_RE.findall(text))
+
+            for term in seen:
+                tid = term_ids.get(term)
+                if tid is None:
+                    tid = term_ids[term] = len(postings)
+                    postings.append([])
+                postings[tid].append(vidx)
+
+        terms = list(term_ids)
+        grams: Dict[str, List[int]] = {}
+        for tid, term in enumerate(terms):
+            for g in trigrams(term):
+                grams.setdefault(g, []).append(tid)
+
+        return cls(generation, videos, terms, postings, grams)
+
+    def save(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        payload = {
+            "version": INDEX_VERSION,
+            "generation": self.generation,
+            "videos": self.videos,
+            "terms": self.terms,
+            "postings": self.postings,
+            "grams": self.grams,
+        }
+        tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+        tmp.write_text(json.dumps(payload, ensure_ascii=False, separators=(",", ":")), encoding="utf-8")
+        tmp.replace(path)
+
+    @classmethod
+    def load(cls, path: Path) -> "FuzzyIndex | None":
+        try:
+            return cls.loads(path.read_text(encoding="utf-8"))
+        except Exception:
+            return None
+
+    @classmethod
+    def loads(cls, text: str) -> "FuzzyIndex | None":
+        data = json.loads(text)
+        if data.get("version") != INDEX_VERSION:
+            return None
+
+        return cls(
+            data["generation"],
+            data["videos"],
+            data["terms"],
+            data["postings"],
+            data["grams"],
+        )
+
+    def lookup(self, term: str, max_edits: int) -> List[Tuple[str, int]]:
+        """Returns (term, distance) pairs within max_edits of term, closest first."""
+        q_grams = trigrams(term)
+        # every edit destroys at most three of the padded trigrams
+        min_shared = len(q_grams) - 3 * max_edits
+
+        if min_shared > 0:
+            shared: Dict[int, int] = {}
+            for g in q_grams:
+                for tid in self.grams.get(g, ()):
+                    shared[tid] = shared.get(tid, 0) + 1
+            candidates: Iterable[int] = (tid for tid, n in shared.items() if n >= min_shared)
+        else:
+            candidates = range(len(self.terms))
+
+        found = []
+        for tid in candidates:
+            cand = self.terms[tid]
+            d = edit_distance(term, cand, max_edits)
+            if d <= max_edits:
+                found.append((cand, d))
+
+        found.sort(key=lambda x: (x[1], x[0]))
+        return found
+
+    def videos_for(self, terms: Iterable[str]) -> Set[str]:
+        if self._term_ids is None:
+            self._term_ids = {t: i for i, t in enumerate(self.terms)}
+        term_ids = self._term_ids
+
+        out: Set[str] = set()
+        for t in terms:
+            tid = term_ids.get(t)
+            if tid is not None:
+                out.update(self.videos[v] for v in self.postings[tid])
+        return out
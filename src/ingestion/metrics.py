@@ -0,0 +1,145 @@
+import json
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+
+BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 300.0, 1800.0)
+
+Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _key(name: str, labels: Dict[str, Any]) -> Key:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Registry:
+    """Process-local counters and histograms (seconds, fixed buckets)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[Key, float] = {}
+        self.histograms: Dict[Key, Dict[str, Any]] = {}
+
+    def inc(self, name: str, value: float = 1, **labels: Any) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + value
+
+    def observe(self, name: str, seconds: float, **labels: Any) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            h = self.histograms.get(key)
+            if h is None:
+                h = self.histograms[key] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(BUCKETS):
+                if seconds <= bound:
+                    h["buckets"][i] += 1
+            h["sum"] += seconds
+            h["count"] += 1
+
+    @contextmanager
+    def timer(self, name: str, **labels: Any) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - t0, **labels)
+
+    def snapshot(self) -> Dict[str, List[Dict[str, Any]]]:
+        with self._lock:
+            return {
+                "counters": [
+                    {"name": n, "labels": dict(l), "value": v}
+                    for (n, l), v in self.counters.items()
+                ],
+                "histograms": [
+                    {"name": n, "labels": dict(l), **{k: (list(v) if k == "buckets" else v) for k, v in h.items()}}
+                    for (n, l), h in self.histograms.items()
+                ],
+            }
+
+    def merge(self, snapshot: Dict[str, Any]) -> None:
+        with self._lock:
+            for c in snapshot.get("counters", []):
+                key = _key(c["name"], c.get("labels", {}))
+                self.counters[key] = self.counters.get(key, 0) + c["value"]
+
+            for s in snapshot.get("histograms", []):
+                key = _key(s["name"], s.get("labels", {}))
+                h = self.histograms.get(key)
+                if h is None:
+                    h = self.histograms[key] = {"buckets": [0] * len(BUCKETS), "sum": 0.0, "count": 0}
+                h["buckets"] = [a + b for a, b in zip(h["buckets"], s["buckets"])]
+                h["sum"] += s["sum"]
+                h["count"] += s["count"]
+
+    def dump(self, path: Path) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(json.dumps(self.snapshot()), encoding="utf-8")
+        tmp.replace(path)
+
+
+class Stages:
+    """Accumulates time per stage over one operation, e.g. a single search
+    that loads and scans many files, and records each total once."""
+
+    def __init__(self):
+        self.totals: Dict[str, float] = {}
+
+    @contextmanager
+    def time(self, stage: str) -> Iterator[None]:
+        t0 = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.totals[stage] = self.totals.get(stage, 0.0) + time.perf_counter() - t0
+
+    def observe(self, prefix: str, registry: "Registry | None" = None) -> None:
+        registry = registry or REGISTRY
+        for stage, seconds in self.totals.items():
+            registry.observe(f"{prefix}_{stage}_seconds", seconds)
+
+
+def _labels(labels: Dict[str, Any], extra: Dict[str, str] | None = None) -> str:
+    items = dict(labels)
+    if extra:
+        items.update(extra)
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{v}"' for k, v in items.items()) + "}"
+
+
+def render_prometheus(*snapshots: Dict[str, Any]) -> str:
+    lines: List[str] = []
+    typed = set()
+
+    for snap in snapshots:
+        for c in sorted(snap.get("counters", []), key=lambda c: c["name"]):
+            if c["name"] not in typed:
+                typed.add(c["name"])
+                lines.append(f"# TYPE {c['name']} counter")
+            lines.append(f"{c['name']}{_labels(c['labels'])} {c['value']}")
+
+        for h in sorted(snap.get("histograms", []), key=lambda h: h["name"]):
+            name = h["name"]
+            if name not in typed:
+                typed.add(name)
+                lines.append(f"# TYPE {name} histogram")
+            for bound, count in zip(BUCKETS, h["buckets"]):
+                lines.append(f"{name}_bucket{_labels(h['labels'], {'le': str(bound)})} {count}")
+            lines.append(f"{name}_bucket{_labels(h['labels'], {'le': '+Inf'})} {h['count']}")
+            lines.append(f"{name}_sum{_labels(h['labels'])} {h['sum']}")
+            lines.append(f"{name}_count{_labels(h['labels'])} {h['count']}")
+
+    return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+inc = REGISTRY.inc
+observe = REGISTRY.observe
+timer = REGISTRY.timer
@@ -8,23 +8,31 @@ from video_fetch import fetch_video_ids, fetch_videos_metadata
 from video_transcription import try_download_transcript
 from audio_download import download_audio
 from whisper_transcription import transcribe_audio
+from triage import (
+    load_triage,
+    probe_audio,
+    save_triage,
+    spoken_language,
+    track_for_language,
+    triage_videos,
+    whisper_language,
+)
+from metrics import REGISTRY, inc, timer
+from search_engine import build_semantic_index, refresh_segment_index
+import storage
 
 LIMIT = 5
 WHISPER_MODEL = "medium"
 
 
-def repo_root() -> Path:
-    return Path(__file__).resolve().parents[2]
-
-
 def status_file() -> Path:
-    path = repo_root() / "data" / "status" / "current_status.json"
+    path = storage.data_dir() / "status" / "current_status.json"
     path.parent.mkdir(parents=True, exist_ok=True)
     return path
 
 
 def videos_file() -> Path:
-    path = repo_root() / "data" / "channel_videos" / "videos.json"
+    path = storage.data_dir() / "channel_videos" / "videos.json"
     path.parent.mkdir(parents=True, exist_ok=True)
     return path
 
@@ -56,20 +64,33 @@ def save_videos_metadata(videos: list[dict]):
     )
 
 
+def transcripts_dir() -> Path:
+    return storage.data_dir() / "transcripts"
+
+
+def audio_dir() -> Path:
+    return storage.data_dir() / "audio"
+
+
 def yt_transcript_exists(video_id: str) -> bool:
-    return (repo_root() / "data" / "transcripts" / f"{video_id}.json").exists()
+    return storage.transcript_file(transcripts_dir(), video_id) is not None
 
 
 def whisper_transcript_exists(video_id: str) -> bool:
-    return (repo_root() / "data" / "transcripts" / f"{video_id}.json").exists()
+    return storage.transcript_file(transcripts_dir(), video_id) is not None
+
+
+def metrics_file() -> Path:
+    return storage.data_dir() / "metrics" / "pipeline.json"
 
 
 def audio_exists(video_id: str) -> bool:
-    return (repo_root() / "data" / "audio" / f"{video_id}.mp3").exists()
+    return (audio_dir() / f"{video_id}.mp3").exists()
 
 
 def jitter_sleep(a: float, b: float):
-    time.sleep(a + random.random() * (b - a))
+    with timer("pipeline_sleep_seconds", source="pipeline"):
+        time.sleep(a + random.random() * (b - a))
 
 
 def main():
@@ -79,8 +100,10 @@ def main():
     try:
         write_status("running", "Preuzimanje liste videa...", 5, None, False)
 
-        ids = fetch_video_ids(channel_url)
-        videos = fetch_videos_metadata(channel_url)
+        with timer("pipeline_list_seconds", step="ids"):
+            ids = fetch_video_ids(channel_url)
+        with timer("pipeline_list_seconds", step="metadata"):
+            videos = fetch_videos_metadata(channel_url)
 
         if LIMIT is not None:
             videos = videos[:LIMIT]
@@ -105,81 +128,159 @@ def main():
             True,
         )
 
+        # one listing per video picks the cheapest caption track and fetches
+        # it right away; only what is left goes on to audio
+        pending = [vid for vid in ids if not yt_transcript_exists(vid)]
+        triaged = load_triage()
+
+        def triage_progress(done: int, count: int):
+            REGISTRY.dump(metrics_file())
+            write_status(
+                "running",
+                f"Provera titlova {done}/{count}",
+                10 + int(done / max(count, 1) * 30),
+                None,
+                True,
+            )
+
+        blocked, from_triage = triage_videos(pending, triaged, triage_progress)
+        if blocked:
+            msg = f"IP blocked detected while listing transcripts for video {blocked}."
+            write_status("error", msg, 10, "ip_blocked", True)
+            print("\nIP blocked detected.")
+            return
+
+        def video_progress(idx: int, step: float) -> int:
+            # each video gets its share of 40-90, step is the part of it done
+            return 40 + int((idx - 1 + step) / total * 50)
+
         for idx, vid in enumerate(ids, start=1):
-            base_progress = int(((idx - 1) / total) * 80) + 10
+            REGISTRY.dump(metrics_file())
 
             write_status(
                 "running",
                 f"Obrada videa",
-                base_progress,
+                video_progress(idx, 0),
                 None,
                 True,
             )
 
             if yt_transcript_exists(vid):
-                print(f"[{idx}] {vid}: YouTube transcript cached")
+                fresh = vid in from_triage
+                print(f"[{idx}] {vid}: YouTube transcript {'saved' if fresh else 'cached'}")
+                inc("pipeline_videos_total", outcome="youtube" if fresh else "cached")
+                storage.evict_audio(audio_dir(), vid)
                 continue
 
             if whisper_transcript_exists(vid):
                 print(f"[{idx}] {vid}: Whisper transcript cached")
+                inc("pipeline_videos_total", outcome="cached")
                 continue
 
-            write_status(
-                "running",
-                f"Preuzimanje transkripta",
-                base_progress + 1,
-                None,
-                True,
-            )
+            entry = triaged.setdefault(vid, {})
+            if entry.get("probe", {}).get("speech") is False:
+                print(f"[{idx}] {vid}: no speech, skipped")
+                inc("pipeline_videos_total", outcome="no_speech")
+                continue
 
-            jitter_sleep(7, 12)
+            # without a listing (e.g. it failed) the Serbian tracks are tried as before
+            if entry.get("source") != "audio":
+                write_status(
+                    "running",
+                    f"Preuzimanje transkripta",
+                    video_progress(idx, 0.05),
+                    None,
+                    True,
+                )
 
-            ok, status, err = try_download_transcript(vid)
-            print(f"[{idx}] {vid}: transcript -> {status}")
+                jitter_sleep(7, 12)
 
-            if status == "ip_blocked":
-                msg = f"IP blocked detected while checking transcript for video {vid}."
-                write_status("error", msg, base_progress + 1, err or "ip_blocked", True)
-                print("\nIP blocked detected.")
-                return
+                track = entry.get("track")
+                with timer("pipeline_transcript_fetch_seconds"):
+                    ok, status, err = try_download_transcript(vid, [track["language_code"]] if track else None)
+                inc("pipeline_transcript_fetch_total", status=status)
+                print(f"[{idx}] {vid}: transcript -> {status}")
 
-            if ok:
-                continue
+                if status == "ip_blocked":
+                    msg = f"IP blocked detected while checking transcript for video {vid}."
+                    write_status("error", msg, video_progress(idx, 0.05), err or "ip_blocked", True)
+                    print("\nIP blocked detected.")
+                    return
+
+                if ok:
+                    inc("pipeline_videos_total", outcome="youtube")
+                    continue
 
             if not audio_exists(vid):
                 write_status(
                     "running",
                     f"Preuzimanje audio fajlova",
-                    base_progress + 8,
+                    video_progress(idx, 0.4),
                     None,
                     True,
                 )
 
                 jitter_sleep(4, 8)
 
-                audio_ok, audio_err = download_audio(vid)
+                with timer("pipeline_audio_download_seconds"):
+                    audio_ok, audio_err = download_audio(vid)
                 if not audio_ok:
                     print(f"Audio failed for {vid}: {audio_err}")
+                    inc("pipeline_videos_total", outcome="audio_failed")
                     continue
             else:
                 print(f"[{idx}] {vid}: audio cached")
 
+            if "probe" not in entry:
+                try:
+                    entry["probe"] = probe_audio(audio_dir() / f"{vid}.mp3")
+                    save_triage(triaged)
+                except Exception as e:
+                    print(f"[{idx}] {vid}: probe failed ({type(e).__name__}: {e})")
+
+            probe = entry.get("probe") or {}
+            print(f"[{idx}] {vid}: probe -> {probe}")
+
+            if probe.get("speech") is False:
+                storage.evict_audio(audio_dir(), vid)
+                inc("pipeline_videos_total", outcome="no_speech")
+                continue
+
+            # a caption track in the spoken language beats transcribing it
+            spoken = spoken_language(probe)
+            track = track_for_language(entry.get("tracks") or [], spoken) if spoken else None
+            if track and track != entry.get("track"):
+                jitter_sleep(7, 12)
+                with timer("pipeline_transcript_fetch_seconds"):
+                    ok, status, _ = try_download_transcript(vid, [track["language_code"]])
+                inc("pipeline_transcript_fetch_total", status=status)
+                if ok:
+                    storage.evict_audio(audio_dir(), vid)
+                    inc("pipeline_videos_total", outcome="youtube")
+                    continue
+
+            language = whisper_language(spoken)
+
             write_status(
                 "running",
                 f"Whisper transkripcija za video {idx}/{total}",
-                base_progress + 15,
+                video_progress(idx, 0.7),
                 None,
                 True,
             )
 
-            print(f"[{idx}] {vid}: running Whisper ({WHISPER_MODEL})...")
-            whisper_ok = transcribe_audio(vid, model_name=WHISPER_MODEL)
+            print(f"[{idx}] {vid}: running Whisper ({WHISPER_MODEL}, {language})...")
+            whisper_ok = transcribe_audio(vid, model_name=WHISPER_MODEL, language=language)
+
+            inc("pipeline_videos_total", outcome="whisper" if whisper_ok else "whisper_failed")
 
             if whisper_ok:
+                if storage.evict_audio(audio_dir(), vid):
+                    print(f"[{idx}] {vid}: audio removed")
                 write_status(
                     "running",
                     f"Whisper transcript sačuvan za video {idx}/{total}",
-                    base_progress + 20,
+                    video_progress(idx, 0.95),
                     None,
                     True,
                 )
@@ -188,18 +289,35 @@ def main():
                 write_status(
                     "running",
                     f"Whisper nije uspio za video {idx}/{total}: {vid}",
-                    base_progress + 20,
+                    video_progress(idx, 0.95),
                     None,
                     True,
                 )
 
+        write_status("running", "Izgradnja indeksa za pretragu...", 95, None, True)
+        with timer("pipeline_index_build_seconds"):
+            refresh_segment_index()
+
+        write_status("running", "Izgradnja semantičkog indeksa...", 97, None, True)
+        try:
+            with timer("pipeline_semantic_index_seconds"):
+                build_semantic_index()
+        except Exception as e:
+            # optional mode: a missing package or model must not fail the ingest
+            print(f"Semantic index skipped ({type(e).__name__}: {e}).")
+            inc("pipeline_semantic_index_skipped_total")
+
         write_status("done", "Obrada kanala završena.", 100, None, True)
         print("\nDone.")
 
     except Exception as e:
+        inc("pipeline_errors_total")
         write_status("error", "Greška tokom obrade kanala.", 100, str(e), False)
         raise
 
+    finally:
+        REGISTRY.dump(metrics_file())
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
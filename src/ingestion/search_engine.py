@@ -1,23 +1,52 @@
+import cProfile
+import hashlib
 import json
+import os
 import re
+import shutil
 import sys
+import threading
+import time
 import unicodedata
 from dataclasses import dataclass
 from pathlib import Path
-from typing import Any, Dict, Iterable, List, Tuple
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
 
+import storage
+from fuzzy_index import WORD_RE, FuzzyIndex, default_max_edits
+from segment_index import Segment, SegmentIndex, Words
+from transcript_cleaning import clean_transcript
+from metrics import Stages
+
+
+_CYR_TO_LAT = {
+    "а": "a", "б": "b", "в": "v", "г": "g", "д": "d", "ђ": "d",
+    "е": "e", "ж": "z", "з": "z", "и": "i", "ј": "j", "к": "k",
+    "л": "l", "љ": "lj", "м": "m", "н": "n", "њ": "nj", "о": "o",
+    "п": "p", "р": "r", "с": "s", "т": "t", "ћ": "c", "у": "u",
+    "ф": "f", "х": "h", "ц": "c", "ч": "c", "џ": "dz", "ш": "s",
+}
 
 _SR_MAP = str.maketrans({
     "č": "c", "ć": "c", "š": "s", "ž": "z", "đ": "d",
     "Č": "c", "Ć": "c", "Š": "s", "Ž": "z", "Đ": "d",
+    **_CYR_TO_LAT,
+    **{cyr.upper(): lat for cyr, lat in _CYR_TO_LAT.items()},
 })
 
 
 def normalize_sr(s: str) -> str:
-    s = (s or "").translate(_SR_MAP).lower()
-    s = unicodedata.normalize("NFKD", s)
-    s = "".join(ch for ch in s if not unicodedata.combining(ch))
-    return s
+    s = s or ""
+    # strip accents first, so that precomposed letters (ѐ, ѝ, ѓ, ќ, ё...)
+    # reach the Cyrillic table as their base letter; non-ASCII punctuation
+    # („“, –, …) becomes a space, the index scans bytes relying on that
+    if not s.isascii():
+        s = unicodedata.normalize("NFKD", s)
+        s = "".join(
+            ch if ch.isascii() or ch.isalnum() else " "
+            for ch in s if not unicodedata.combining(ch)
+        )
+    return s.translate(_SR_MAP).lower()
 
 
 def format_mmss(seconds: float) -> str:
@@ -70,97 +99,486 @@ class Hit:
     mmss: str
     snippet: str
     url: str
+    score: Optional[float] = None
 
 
-def project_root() -> Path:
-    return Path(__file__).resolve().parents[2]
+def data_dir() -> Path:
+    return storage.data_dir()
 
 
 def transcripts_dir() -> Path:
-    return project_root() / "data" / "transcripts"
+    return data_dir() / "transcripts"
+
+
+def index_dir() -> Path:
+    return data_dir() / "index"
+
+
+def fuzzy_index_file() -> Path:
+    return index_dir() / "fuzzy_index.json"
 
 
 def iter_transcript_files() -> Iterable[Path]:
-    d = transcripts_dir()
-    if not d.exists():
-        return []
-    return sorted(d.glob("*.json"))
+    return storage.iter_transcript_files(transcripts_dir())
 
 
 def load_json(path: Path) -> Any:
-    return json.loads(path.read_text(encoding="utf-8"))
+    return storage.read_transcript(path)
 
 
-def _search_youtube_list(video_id: str, items: List[Dict[str, Any]], pattern: re.Pattern) -> List[Hit]:
-    hits: List[Hit] = []
-    for it in items:
-        text = it.get("text") or ""
-        start = float(it.get("start") or 0.0)
+def bundle_file() -> Optional[Path]:
+    """A search node can serve an exported bundle as is (see bundle.py)."""
+    override = os.environ.get("YT_SEARCH_BUNDLE")
+    return Path(override) if override else None
 
-        if pattern.search(normalize_sr(text)):
-            hits.append(Hit(
-                video_id=video_id,
-                t=start,
-                mmss=format_mmss(start),
-                snippet=text.strip(),
-                url=f"https://www.youtube.com/watch?v={video_id}&t={int(start)}s"
-            ))
-    return hits
 
+_BUNDLE = None
+_BUNDLE_LOCK = threading.Lock()
 
-def _search_whisper(video_id: str, payload: Dict[str, Any], pattern: re.Pattern) -> List[Hit]:
-    hits: List[Hit] = []
-    segments = payload.get("segments") or []
 
-    for seg in segments:
-        text = (seg.get("text") or "").strip()
-        start = float(seg.get("start") or 0.0)
+def load_bundle():
+    global _BUNDLE
+    from bundle import Bundle
+
+    path = bundle_file()
+    with _BUNDLE_LOCK:
+        if _BUNDLE is None or _BUNDLE.path != path:
+            _BUNDLE = Bundle(path)
+        return _BUNDLE
+
+
+_GENERATION: Tuple[Optional[int], str] = (None, "")
+
+
+def corpus_generation() -> str:
+    global _GENERATION
+    d = transcripts_dir()
+
+    # transcripts are only ever created or atomically replaced, both of
+    # which touch the directory, so its mtime guards the full rescan
+    try:
+        dir_stamp: Optional[int] = d.stat().st_mtime_ns
+    except FileNotFoundError:
+        dir_stamp = None
+
+    if dir_stamp is not None and _GENERATION[0] == dir_stamp:
+        return _GENERATION[1]
+
+    _GENERATION = (dir_stamp, files_generation(iter_transcript_files()))
+    return _GENERATION[1]
+
+
+def files_generation(paths: Iterable[Path]) -> str:
+    h = hashlib.sha1()
+    for p in paths:
+        st = p.stat()
+        h.update(f"{p.name}:{st.st_size}:{st.st_mtime_ns}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def _word_offsets(norm: str, words: List[Dict[str, Any]]) -> Words:
+    out: Words = []
+    cursor = 0
+    for w in words:
+        token = normalize_sr((w.get("word") or "").strip())
+        if not token or w.get("start") is None:
+            continue
+        pos = norm.find(token, cursor)
+        if pos < 0:
+            continue
+        out.append((pos, float(w["start"])))
+        cursor = pos + len(token)
+    return out
+
+
+def transcript_segments(data: Any) -> List[Segment]:
+    data = clean_transcript(data)
+
+    if isinstance(data, list):
+        return [
+            (float(it.get("start") or 0.0), (it.get("text") or "").strip(), normalize_sr(it.get("text") or ""), None)
+            for it in data
+        ]
+
+    if isinstance(data, dict) and isinstance(data.get("segments"), list):
+        out = []
+        for seg in data["segments"]:
+            text = (seg.get("text") or "").strip()
+            norm = normalize_sr(text)
+            words = _word_offsets(norm, seg["words"]) if seg.get("words") else None
+            out.append((float(seg.get("start") or 0.0), text, norm, words))
+        return out
+
+    return []
+
+
+def iter_corpus_segments(paths: Optional[Iterable[Path]] = None) -> Iterable[Tuple[str, List[Segment]]]:
+    for p in iter_transcript_files() if paths is None else paths:
+        try:
+            segments = transcript_segments(load_json(p))
+        except Exception:
+            continue
+        yield storage.video_id_of(p), segments
+
+
+def segment_index_file(generation: str) -> Path:
+    return index_dir() / f"segments-{generation[:16]}.idx"
+
+
+_SEGMENT_INDEX: Optional[SegmentIndex] = None
+_SEGMENT_LOCK = threading.Lock()
+# held while a snapshot is written, so two builds never race on one file
+_BUILD_LOCK = threading.Lock()
+_REBUILDING = False
+
+
+def _open_snapshot(generation: str) -> Optional[SegmentIndex]:
+    path = segment_index_file(generation)
+    index = SegmentIndex.open(path) if path.exists() else None
+    return index if index is not None and index.generation == generation else None
+
+
+def _latest_snapshot() -> Optional[SegmentIndex]:
+    snapshots = sorted(index_dir().glob("segments-*.idx"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for path in snapshots:
+        index = SegmentIndex.open(path)
+        if index is not None:
+            return index
+    return None
+
+
+def refresh_segment_index() -> SegmentIndex:
+    """Builds the snapshot (and fuzzy index) of the current corpus when it
+    is missing and swaps it in. The pipeline calls this once per ingest."""
+    global _SEGMENT_INDEX
+    if bundle_file() is not None:
+        return load_bundle().segment_index()
+
+    with _BUILD_LOCK:
+        generation = corpus_generation()
+        index = _open_snapshot(generation)
+        path = segment_index_file(generation)
+
+        if index is None:
+            header, sections = SegmentIndex.build(generation, iter_corpus_segments())
+            SegmentIndex.write(path, header, sections)
+            index = SegmentIndex.open(path)
+
+        # ready before the swap, so queries never build it either
+        _fuzzy_index_for(index)
+
+        with _SEGMENT_LOCK:
+            _SEGMENT_INDEX = index
+
+        # older snapshots may still be mapped (and locked on Windows); a
+        # newer one may come from another process and is left alone
+        built = path.stat().st_mtime
+        for old in index_dir().glob("segments-*.idx"):
+            try:
+                if old != path and old.stat().st_mtime <= built:
+                    old.unlink()
+            except OSError:
+                pass
+
+    return index
+
+
+# a new transcript lands every few seconds during an ingest, and the
+# pipeline builds the final snapshot itself, so queries only rebuild once
+# the corpus has been quiet for a while and no ingest is running
+REBUILD_QUIET_SECONDS = 60
+# a "running" status this old is left over from a killed pipeline
+INGEST_STALE_SECONDS = 6 * 3600
+
+
+def ingest_running() -> bool:
+    path = data_dir() / "status" / "current_status.json"
+    try:
+        if time.time() - path.stat().st_mtime > INGEST_STALE_SECONDS:
+            return False
+        return json.loads(path.read_text(encoding="utf-8")).get("status") == "running"
+    except Exception:
+        return False
+
+
+def _corpus_quiet() -> bool:
+    stamp = _GENERATION[0]
+    return stamp is None or time.time_ns() - stamp > REBUILD_QUIET_SECONDS * 1_000_000_000
+
+
+def _refresh_in_background() -> None:
+    global _REBUILDING
+    try:
+        refresh_segment_index()
+    except Exception as e:
+        print(f"Segment index rebuild failed: {type(e).__name__}: {e}")
+    finally:
+        with _SEGMENT_LOCK:
+            _REBUILDING = False
+
+
+def load_segment_index() -> SegmentIndex:
+    """Snapshot for queries. When transcripts changed since it was built,
+    a snapshot another process (the pipeline) wrote for them is picked up;
+    otherwise the previous one keeps serving and a background thread builds
+    the new one once the ingest is over. Only a node without any snapshot
+    builds on the query path."""
+    global _SEGMENT_INDEX, _REBUILDING
+    if bundle_file() is not None:
+        return load_bundle().segment_index()
+
+    generation = corpus_generation()
+
+    with _SEGMENT_LOCK:
+        if _SEGMENT_INDEX is None or _SEGMENT_INDEX.generation != generation:
+            _SEGMENT_INDEX = _open_snapshot(generation) or _SEGMENT_INDEX or _latest_snapshot()
+        index = _SEGMENT_INDEX
+
+        stale = index is not None and index.generation != generation
+        if stale and not _REBUILDING and _corpus_quiet() and not ingest_running():
+            _REBUILDING = True
+            threading.Thread(target=_refresh_in_background, name="segment-index", daemon=True).start()
 
-        if pattern.search(normalize_sr(text)):
+    if index is None:
+        return refresh_segment_index()
+    return index
+
+
+def semantic_index_dir(generation: str) -> Path:
+    return index_dir() / f"semantic-{generation[:16]}"
+
+
+def embeddings_dir() -> Path:
+    return data_dir() / "embeddings"
+
+
+SEMANTIC_TOP_K = 50
+
+_SEMANTIC_INDEX = None
+_SEMANTIC_LOCK = threading.Lock()
+
+
+def build_semantic_index() -> Path:
+    # numpy and the embedding model are optional; only semantic mode needs them
+    import semantic_index
+
+    segments = refresh_segment_index()
+    out_dir = semantic_index_dir(segments.generation)
+    semantic_index.build(segments, out_dir, embeddings_dir())
+
+    for old in index_dir().glob("semantic-*"):
+        if old != out_dir:
+            shutil.rmtree(old, ignore_errors=True)
+    return out_dir
+
+
+def load_semantic_index():
+    """Opens the semantic index of the current corpus, or the newest one
+    built so far; embedding happens at ingest, never on a query."""
+    global _SEMANTIC_INDEX
+    import semantic_index
+
+    if bundle_file() is not None:
+        raise RuntimeError("Semantička pretraga nije dostupna direktno iz bundle-a (python src/ingestion/bundle.py import).")
+
+    current = semantic_index_dir(corpus_generation())
+    built = sorted(index_dir().glob("semantic-*"), key=lambda p: p.stat().st_mtime, reverse=True)
+    candidates = [current] + [p for p in built if p != current]
+
+    with _SEMANTIC_LOCK:
+        for path in candidates:
+            if _SEMANTIC_INDEX is not None and _SEMANTIC_INDEX[0] == path:
+                return _SEMANTIC_INDEX[1]
+            if not (path / "header.json").exists():
+                continue
+            index = semantic_index.SemanticIndex.open(path)
+            if index is not None:
+                _SEMANTIC_INDEX = (path, index)
+                return index
+
+    raise RuntimeError("Semantički indeks nije izgrađen (python src/ingestion/search_engine.py --build-semantic).")
+
+
+_FUZZY_INDEX: Optional[FuzzyIndex] = None
+_FUZZY_LOCK = threading.Lock()
+
+
+def load_fuzzy_index() -> FuzzyIndex:
+    if bundle_file() is not None:
+        return load_bundle().fuzzy_index()
+    return _fuzzy_index_for(load_segment_index())
+
+
+def _fuzzy_index_for(segments: SegmentIndex) -> FuzzyIndex:
+    global _FUZZY_INDEX
+    generation = segments.generation
+
+    with _FUZZY_LOCK:
+        if _FUZZY_INDEX is not None and _FUZZY_INDEX.generation == generation:
+            return _FUZZY_INDEX
+
+        path = fuzzy_index_file()
+        index = FuzzyIndex.load(path) if path.exists() else None
+
+        if index is None or index.generation != generation:
+            index = FuzzyIndex.build(generation, segments.iter_video_texts())
+            index.save(path)
+
+        _FUZZY_INDEX = index
+        return index
+
+
+def build_fuzzy_pattern(query: str, index: FuzzyIndex) -> Tuple[Optional[re.Pattern], Set[str]]:
+    tokens = WORD_RE.findall(normalize_sr(query))
+    if not tokens:
+        return None, set()
+
+    groups = []
+    videos: Optional[Set[str]] = None
+
+    for tok in tokens:
+        matches = [t for t, _ in index.lookup(tok, default_max_edits(tok))]
+        if not matches:
+            return None, set()
+
+        tok_videos = index.videos_for(matches)
+        videos = tok_videos if videos is None else videos & tok_videos
+
+        matches.sort(key=len, reverse=True)
+        groups.append("(?:" + "|".join(re.escape(m) for m in matches) + ")")
+
+    pattern = re.compile(r"\b" + r"\W+".join(groups) + r"\b")
+    return pattern, videos or set()
+
+
+def search_all(
+    pattern: re.Pattern,
+    video_ids: Optional[Set[str]] = None,
+    stages: Optional[Stages] = None,
+) -> List[Hit]:
+    stages = stages or Stages()
+
+    with stages.time("load"):
+        index = load_segment_index()
+
+    hits: List[Hit] = []
+    with stages.time("match"):
+        for seg, offset in index.find(pattern, video_ids):
+            video_id = index.videos[index.seg_video[seg]]
+            start = index.word_time(seg, offset)
             hits.append(Hit(
                 video_id=video_id,
                 t=start,
                 mmss=format_mmss(start),
-                snippet=text,
+                snippet=index.snippet(seg),
                 url=f"https://www.youtube.com/watch?v={video_id}&t={int(start)}s"
             ))
     return hits
 
 
-def search_file(path: Path, pattern: re.Pattern) -> List[Hit]:
-    video_id = path.stem
-    data = load_json(path)
+def search_fuzzy(query: str, stages: Optional[Stages] = None) -> List[Hit]:
+    stages = stages or Stages()
 
-    if isinstance(data, list):
-        return _search_youtube_list(video_id, data, pattern)
+    with stages.time("fuzzy_lookup"):
+        pattern, video_ids = build_fuzzy_pattern(query, load_fuzzy_index())
 
-    if isinstance(data, dict) and isinstance(data.get("segments"), list):
-        return _search_whisper(video_id, data, pattern)
+    if pattern is None:
+        return []
+    return search_all(pattern, video_ids, stages)
 
-    return []
 
+def search_semantic(query: str, stages: Optional[Stages] = None) -> List[Hit]:
+    stages = stages or Stages()
+
+    with stages.time("load"):
+        index = load_semantic_index()
 
-def search_all(pattern: re.Pattern) -> List[Hit]:
     hits: List[Hit] = []
-    for p in iter_transcript_files():
-        hits.extend(search_file(p, pattern))
+    with stages.time("match"):
+        for i, score in index.query(query, k=SEMANTIC_TOP_K):
+            video_id = index.videos[int(index.video_idx[i])]
+            start = float(index.starts[i])
+            hits.append(Hit(
+                video_id=video_id,
+                t=start,
+                mmss=format_mmss(start),
+                snippet=index.snippet(i),
+                url=f"https://www.youtube.com/watch?v={video_id}&t={int(start)}s",
+                score=score
+            ))
     return hits
 
 
-def search(query: str) -> Tuple[List[Hit], str]:
+def search(query: str, mode: str = "auto", stages: Optional[Stages] = None) -> Tuple[List[Hit], str]:
+    stages = stages or Stages()
+
+    if mode == "fuzzy":
+        return search_fuzzy(query, stages), "fuzzy"
+
+    if mode == "semantic":
+        return search_semantic(query, stages), "semantic"
+
     exact_pat = build_exact_pattern(query)
-    hits = search_all(exact_pat)
+    hits = search_all(exact_pat, stages=stages)
     if hits:
         return hits, "exact"
 
     forms_pat = build_forms_pattern(query)
-    hits = search_all(forms_pat)
+    hits = search_all(forms_pat, stages=stages)
     return hits, "forms"
 
 
+def hit_to_dict(h: Hit) -> Dict[str, Any]:
+    out = {
+        "video_id": h.video_id,
+        "seconds": int(h.t),
+        "timestamp": h.mmss,
+        "url": h.url,
+        "snippet": h.snippet
+    }
+    if h.score is not None:
+        out["score"] = round(h.score, 4)
+    return out
+
+
+def group_by_video(
+    hits: List[Hit],
+    videos: List[Dict[str, Any]],
+    order: str = "hits",
+    max_timestamps: int = 3,
+) -> List[Dict[str, Any]]:
+    meta = {v.get("video_id"): v for v in videos if v.get("video_id")}
+    # videos.json keeps the channel listing order, which is newest first
+    rank = {vid: i for i, vid in enumerate(meta)}
+
+    groups: Dict[str, List[Hit]] = {}
+    for h in hits:
+        groups.setdefault(h.video_id, []).append(h)
+
+    entries = []
+    for video_id, video_hits in groups.items():
+        video_hits.sort(key=lambda h: h.t)
+        info = meta.get(video_id, {})
+        entries.append({
+            "video_id": video_id,
+            "title": info.get("title", ""),
+            "thumbnail": info.get("thumbnail", ""),
+            "url": info.get("url") or f"https://www.youtube.com/watch?v={video_id}",
+            "hit_count": len(video_hits),
+            "timestamps": [hit_to_dict(h) for h in video_hits[:max_timestamps]]
+        })
+
+    unknown = len(rank)
+    if order == "recent":
+        entries.sort(key=lambda e: (rank.get(e["video_id"], unknown), -e["hit_count"]))
+    else:
+        entries.sort(key=lambda e: (-e["hit_count"], rank.get(e["video_id"], unknown)))
+
+    return entries
+
+
 def save_results_to_json(hits: List[Hit], query: str, mode: str):
-    root = project_root()
-    results_dir = root / "data" / "search_results"
+    results_dir = data_dir() / "search_results"
     results_dir.mkdir(parents=True, exist_ok=True)
 
     results_file = results_dir / "results.json"
@@ -172,16 +590,7 @@ def save_results_to_json(hits: List[Hit], query: str, mode: str):
         "query": query,
         "mode": mode,
         "count": len(hits),
-        "results": [
-            {
-                "video_id": h.video_id,
-                "seconds": int(h.t),
-                "timestamp": h.mmss,
-                "url": h.url,
-                "snippet": h.snippet
-            }
-            for h in hits
-        ]
+        "results": [hit_to_dict(h) for h in hits]
     }
 
     results_file.write_text(
@@ -190,14 +599,54 @@ def save_results_to_json(hits: List[Hit], query: str, mode: str):
     )
 
 
+# YT_SEARCH_PROFILE=1 turns on cProfile dumps of searches, for the CLI and
+# for ?profile=true on the backend; only the newest dumps are kept
+PROFILE_KEEP = 20
+
+
+def profiling_enabled() -> bool:
+    return os.environ.get("YT_SEARCH_PROFILE", "") not in ("", "0")
+
+
+def profiles_dir() -> Path:
+    return data_dir() / "profiles"
+
+
+def save_profile(profiler: cProfile.Profile) -> Path:
+    path = profiles_dir() / f"search-{time.time_ns()}.prof"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    profiler.dump_stats(str(path))
+
+    dumps = sorted(profiles_dir().glob("search-*.prof"), key=lambda p: p.stat().st_mtime, reverse=True)
+    for old in dumps[PROFILE_KEEP:]:
+        try:
+            old.unlink()
+        except OSError:
+            pass
+    return path
+
+
 def main():
     if len(sys.argv) < 2:
         return
 
+    if sys.argv[1] == "--build-semantic":
+        print(f"Semantic index: {build_semantic_index()}")
+        return
+
     query = sys.argv[1].strip()
-    hits, mode = search(query)
+    requested = sys.argv[2].strip() if len(sys.argv) > 2 else "auto"
+    profiler = cProfile.Profile() if profiling_enabled() else None
+    if profiler:
+        profiler.enable()
+
+    hits, mode = search(query, requested)
     save_results_to_json(hits, query, mode)
 
+    if profiler:
+        profiler.disable()
+        print(f"Profile: {save_profile(profiler)}")
+
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,288 @@
+import json
+import mmap
+import re
+import struct
+import uuid
+from array import array
+from bisect import bisect_right
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+
+INDEX_VERSION = 7
+
+MAGIC = b"YTSIDX01"
+
+# (character offset in the normalized text, start seconds) of each word
+Words = List[Tuple[int, float]]
+
+# (start seconds, snippet as shown, normalized text, word timings or None)
+Segment = Tuple[float, str, str, Optional[Words]]
+
+_U16_MAX = 0xFFFF
+
+_ALIGN = 8
+
+# the text blob is scanned as bytes, where \b and \w are ASCII only;
+# normalize_sr leaves no non-ASCII character that is not a word character,
+# so every byte of a multi-byte UTF-8 sequence counts as one
+_WORD = rb"[0-9A-Za-z_\x80-\xff]"
+# the newline separates segments, so no match may run across it
+_NON_WORD = rb"[^0-9A-Za-z_\x80-\xff\n]"
+_BOUNDARY = rb"(?:(?<=" + _WORD + rb")(?!" + _WORD + rb")|(?<!" + _WORD + rb")(?=" + _WORD + rb"))"
+_CLASSES = {b"\\b": _BOUNDARY, b"\\w": _WORD, b"\\W": _NON_WORD}
+_IS_WORD = bytes(1 if re.fullmatch(_WORD, bytes([b])) else 0 for b in range(256))
+
+
+def _pad(n: int) -> int:
+    return (-n) % _ALIGN
+
+
+def bytes_pattern(source: str, flags: int = 0) -> re.Pattern:
+    source_b = re.sub(
+        rb"\\.",
+        lambda m: _CLASSES.get(m.group(), m.group()),
+        source.encode("utf-8"),
+    )
+    return re.compile(source_b, flags & ~re.UNICODE)
+
+
+class SegmentIndex:
+    """All transcript segments of the corpus packed into one file that is
+    memory-mapped on open, so a restart does not re-read any transcript.
+
+    Layout: MAGIC, u32 header length, JSON header, then 8-byte aligned
+    sections. The normalized texts of all segments are concatenated into
+    one newline separated UTF-8 blob that the query regex scans directly;
+    per-segment arrays map a match offset back to video, start and snippet.
+    Segments of a video are contiguous; video_segs holds the first segment
+    of each video so a query can scan only the videos it needs.
+
+    Where Whisper produced word timings, each segment also owns a run of
+    word entries: the byte offset of the word in the segment's text and its
+    start in centiseconds, both stored as u16 deltas from the previous word
+    (the first one from the segment start).
+    """
+
+    def __init__(self, header: Dict, buf: memoryview, owner: Optional[object] = None):
+        self.generation: str = header["generation"]
+        self.videos: List[str] = header["videos"]
+        self._video_idx: Optional[Dict[str, int]] = None
+        self._header = header
+        self._buf = buf
+        self._owner = owner
+
+        def section(name: str) -> memoryview:
+            offset, length = header["sections"][name]
+            return buf[offset:offset + length]
+
+        self.text = section("text")
+        self.text_offsets = section("text_offsets").cast("Q")
+        self.seg_video = section("seg_video").cast("I")
+        self.seg_start = section("seg_start").cast("d")
+        self.video_segs = section("video_segs").cast("Q")
+        self.snippets = section("snippets")
+        self.snippet_offsets = section("snippet_offsets").cast("Q")
+        self.word_ptr = section("word_ptr").cast("Q")
+        self.word_pos = section("word_pos").cast("H")
+        self.word_dt = section("word_dt").cast("H")
+
+    def __len__(self) -> int:
+        return len(self.seg_video)
+
+    @staticmethod
+    def build(generation: str, corpus: Iterable[Tuple[str, List[Segment]]]) -> Tuple[Dict, Dict[str, bytes]]:
+        videos: List[str] = []
+        text = bytearray()
+        text_offsets = array("Q", [0])
+        seg_video = array("I")
+        seg_start = array("d")
+        video_segs = array("Q", [0])
+        snippets = bytearray()
+        snippet_offsets = array("Q", [0])
+        word_ptr = array("Q", [0])
+        word_pos = array("H")
+        word_dt = array("H")
+
+        for video_id, segments in corpus:
+            vidx = len(videos)
+            videos.append(video_id)
+
+            for start, snippet, norm, words in segments:
+                encoded = norm.replace("\n", " ").encode("utf-8")
+
+                if words:
+                    ascii_only = norm.isascii()
+                    last_pos = 0
+                    last_cs = 0
+                    for char_pos, t in words:
+                        pos = char_pos if ascii_only else len(norm[:char_pos].encode("utf-8"))
+                        cs = max(last_cs, int(round((t - start) * 100)))
+                        if pos < last_pos or pos - last_pos > _U16_MAX or cs - last_cs > _U16_MAX:
+                            continue
+                        word_pos.append(pos - last_pos)
+                        word_dt.append(cs - last_cs)
+                        last_pos, last_cs = pos, cs
+                word_ptr.append(len(word_pos))
+
+                text += encoded + b"\n"
+                text_offsets.append(len(text))
+                snippets += snippet.encode("utf-8")
+                snippet_offsets.append(len(snippets))
+                seg_video.append(vidx)
+                seg_start.append(start)
+
+            video_segs.append(len(seg_video))
+
+        header = {"version": INDEX_VERSION, "generation": generation, "videos": videos}
+        sections = {
+            "text": bytes(text),
+            "text_offsets": text_offsets.tobytes(),
+            "seg_video": seg_video.tobytes(),
+            "seg_start": seg_start.tobytes(),
+            "video_segs": video_segs.tobytes(),
+            "snippets": bytes(snippets),
+            "snippet_offsets": snippet_offsets.tobytes(),
+            "word_ptr": word_ptr.tobytes(),
+            "word_pos": word_pos.tobytes(),
+            "word_dt": word_dt.tobytes(),
+        }
+        return header, sections
+
+    @staticmethod
+    def write(path: Path, header: Dict, sections: Dict[str, bytes]) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+
+        # section offsets depend on the header size, which depends on the
+        # offsets; lay out until the header stops growing
+        layout: Dict[str, List[int]] = {name: [0, len(blob)] for name, blob in sections.items()}
+        while True:
+            head = json.dumps({**header, "sections": layout}, ensure_ascii=False).encode("utf-8")
+            pos = len(MAGIC) + 4 + len(head)
+            pos += _pad(pos)
+            new_layout = {}
+            for name, blob in sections.items():
+                new_layout[name] = [pos, len(blob)]
+                pos += len(blob) + _pad(len(blob))
+            if new_layout == layout:
+                break
+            layout = new_layout
+
+        head = json.dumps({**header, "sections": layout}, ensure_ascii=False).encode("utf-8")
+        # the pipeline and the backend may write the same snapshot at once
+        tmp = path.with_name(f"{path.name}.{uuid.uuid4().hex}.tmp")
+
+        try:
+            with open(tmp, "wb") as f:
+                f.write(MAGIC + struct.pack("<I", len(head)) + head)
+                f.write(b"\0" * _pad(f.tell()))
+                for name, blob in sections.items():
+                    assert f.tell() == layout[name][0]
+                    f.write(blob)
+                    f.write(b"\0" * _pad(len(blob)))
+            tmp.replace(path)
+        except BaseException:
+            tmp.unlink(missing_ok=True)
+            raise
+
+    @classmethod
+    def open(cls, path: Path) -> Optional["SegmentIndex"]:
+        try:
+            with open(path, "rb") as f:
+                mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        return cls.from_buffer(memoryview(mm), owner=mm)
+
+    @classmethod
+    def from_buffer(cls, buf: memoryview, owner: Optional[object] = None) -> Optional["SegmentIndex"]:
+        if bytes(buf[:len(MAGIC)]) != MAGIC:
+            return None
+
+        (head_len,) = struct.unpack_from("<I", buf, len(MAGIC))
+        start = len(MAGIC) + 4
+        try:
+            header = json.loads(bytes(buf[start:start + head_len]))
+        except ValueError:
+            return None
+
+        if header.get("version") != INDEX_VERSION:
+            return None
+
+        return cls(header, buf, owner)
+
+    def save_as(self, path: Path, generation: str) -> None:
+        """Writes a copy of the index under another corpus generation, e.g.
+        after its transcripts were unpacked somewhere else."""
+        header = {k: v for k, v in self._header.items() if k != "sections"}
+        sections = {
+            name: bytes(self._buf[offset:offset + length])
+            for name, (offset, length) in self._header["sections"].items()
+        }
+        SegmentIndex.write(path, {**header, "generation": generation}, sections)
+
+    def segment_text(self, seg: int) -> str:
+        return bytes(self.text[self.text_offsets[seg]:self.text_offsets[seg + 1] - 1]).decode("utf-8")
+
+    def snippet(self, seg: int) -> str:
+        return bytes(self.snippets[self.snippet_offsets[seg]:self.snippet_offsets[seg + 1]]).decode("utf-8")
+
+    def word_time(self, seg: int, offset: int) -> float:
+        """Start time of the word at byte offset within the segment text,
+        falling back to the segment start when no word timings exist."""
+        t = self.seg_start[seg]
+        pos = cs = 0
+        for i in range(self.word_ptr[seg], self.word_ptr[seg + 1]):
+            pos += self.word_pos[i]
+            if pos > offset:
+                break
+            cs += self.word_dt[i]
+        return round(t + cs / 100, 2)
+
+    def find(self, pattern: re.Pattern, video_ids: Optional[Set[str]] = None) -> Iterator[Tuple[int, int]]:
+        """Yields (segment, match offset within its normalized text), at most
+        one per segment, in corpus order. With video_ids only the text of
+        those videos is scanned."""
+        # a leading \b as a lookaround would hide the literal prefix the
+        # regex engine searches for, so it is checked on each match instead
+        source = pattern.pattern
+        leading = source.startswith(r"\b")
+        search = bytes_pattern(source[2:] if leading else source, pattern.flags).search
+        text = self.text
+        offsets = self.text_offsets
+
+        if video_ids is None:
+            spans = [(0, len(text))]
+        else:
+            if self._video_idx is None:
+                self._video_idx = {v: i for i, v in enumerate(self.videos)}
+            vidxs = sorted(self._video_idx[v] for v in video_ids if v in self._video_idx)
+            spans = [(offsets[self.video_segs[v]], offsets[self.video_segs[v + 1]]) for v in vidxs]
+
+        for start, end in spans:
+            pos = start
+            while pos < end:
+                m = search(text, pos, end)
+                if m is None:
+                    break
+
+                at = m.start()
+                if leading and at > 0 and _IS_WORD[text[at - 1]] == (at < end and _IS_WORD[text[at]]):
+                    pos = at + 1
+                    continue
+
+                seg = bisect_right(offsets, at) - 1
+                yield seg, at - offsets[seg]
+                pos = offsets[seg + 1]
+
+    def video_ranges(self) -> Iterator[Tuple[str, int, int]]:
+        """Yields (video_id, first segment, end segment) per video."""
+        for vidx, video_id in enumerate(self.videos):
+            first, end = self.video_segs[vidx], self.video_segs[vidx + 1]
+            if first < end:
+                yield video_id, first, end
+
+    def iter_video_texts(self) -> Iterator[Tuple[str, List[str]]]:
+        for video_id, first, end in self.video_ranges():
+            yield video_id, [self.segment_text(seg) for seg in range(first, end)]
@@ -0,0 +1,220 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from segment_index import SegmentIndex
+
+
+INDEX_VERSION = 1
+
+# small multilingual model (384 dims) that handles Serbian in both scripts
+EMBED_MODEL = "sentence-transformers/paraphrase-multilingual-MiniLM-L12-v2"
+BATCH_SIZE = 64
+
+# segments are short, so a passage is a few consecutive segments
+WINDOW = 3
+STRIDE = 2
+
+# coarse quantizer: ~sqrt(n) lists, scanned NPROBE at a time
+MAX_LISTS = 1024
+KMEANS_SAMPLE = 20000
+KMEANS_ITERS = 10
+NPROBE = 8
+
+_MODEL = None
+
+
+def load_model():
+    global _MODEL
+    if _MODEL is None:
+        from sentence_transformers import SentenceTransformer
+
+        _MODEL = SentenceTransformer(EMBED_MODEL, device="cpu")
+    return _MODEL
+
+
+def embed(texts: List[str]) -> np.ndarray:
+    if not texts:
+        return np.zeros((0, 0), dtype=np.float32)
+
+    vectors = load_model().encode(
+        texts,
+        batch_size=BATCH_SIZE,
+        normalize_embeddings=True,
+        convert_to_numpy=True,
+        show_progress_bar=False,
+    )
+    return vectors.astype(np.float32)
+
+
+def video_windows(index: SegmentIndex, first: int, end: int) -> List[Tuple[int, str]]:
+    """(first segment, passage text) for the sliding windows of one video."""
+    out = []
+    for seg in range(first, end, STRIDE):
+        last = min(seg + WINDOW, end)
+        out.append((seg, " ".join(index.snippet(s) for s in range(seg, last))))
+        if last == end:
+            break
+    return out
+
+
+def _cached_embeddings(cache_dir: Path, video_id: str, texts: List[str]) -> np.ndarray:
+    key = hashlib.sha1(f"{EMBED_MODEL}\0{WINDOW}\0{STRIDE}\0".encode("utf-8"))
+    key.update("\0".join(texts).encode("utf-8"))
+    digest = key.hexdigest()
+
+    path = cache_dir / f"{video_id}.npz"
+    if path.exists():
+        try:
+            with np.load(path) as cached:
+                if str(cached["key"]) == digest:
+                    return cached["vectors"].astype(np.float32)
+        except Exception:
+            pass
+
+    vectors = embed(texts)
+    cache_dir.mkdir(parents=True, exist_ok=True)
+    np.savez(path, key=np.array(digest), vectors=vectors.astype(np.float16))
+    return vectors
+
+
+def _kmeans(vectors: np.ndarray, k: int, seed: int = 0) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    sample = vectors
+    if len(sample) > KMEANS_SAMPLE:
+        sample = sample[rng.choice(len(sample), KMEANS_SAMPLE, replace=False)]
+
+    centroids = sample[rng.choice(len(sample), k, replace=False)].copy()
+    for _ in range(KMEANS_ITERS):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+        for c in range(k):
+            members = sample[assign == c]
+            if len(members):
+                centroids[c] = members.mean(axis=0)
+        centroids /= np.linalg.norm(centroids, axis=1, keepdims=True) + 1e-12
+
+    return centroids
+
+
+def build(index: SegmentIndex, out_dir: Path, cache_dir: Path) -> Path:
+    """Embeds every passage of the corpus (reusing per-video cached vectors)
+    and writes an int8 IVF index to out_dir."""
+    starts: List[float] = []
+    video_idx: List[int] = []
+    snippets: List[str] = []
+    chunks: List[np.ndarray] = []
+
+    for video_id, first, end in index.video_ranges():
+        windows = video_windows(index, first, end)
+        if not windows:
+            continue
+
+        # vectors are cached per video, keyed by model, windowing and text
+        vectors = _cached_embeddings(cache_dir, video_id, [text for _, text in windows])
+        chunks.append(vectors)
+        vidx = index.seg_video[first]
+        for seg, text in windows:
+            starts.append(index.seg_start[seg])
+            video_idx.append(vidx)
+            snippets.append(text)
+
+    vectors = np.concatenate(chunks) if chunks else np.zeros((0, 1), dtype=np.float32)
+    n = len(vectors)
+    n_lists = max(1, min(MAX_LISTS, int(np.sqrt(n)))) if n else 1
+
+    if n:
+        centroids = _kmeans(vectors, n_lists)
+        assign = np.argmax(vectors @ centroids.T, axis=1)
+    else:
+        centroids = np.zeros((1, vectors.shape[1]), dtype=np.float32)
+        assign = np.zeros(0, dtype=np.int64)
+
+    order = np.argsort(assign, kind="stable")
+    list_offsets = np.searchsorted(assign[order], np.arange(n_lists + 1))
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    np.save(out_dir / "vectors.npy", np.round(vectors[order] * 127).astype(np.int8))
+    np.save(out_dir / "centroids.npy", centroids.astype(np.float32))
+    np.save(out_dir / "list_offsets.npy", list_offsets.astype(np.int64))
+    np.save(out_dir / "starts.npy", np.asarray(starts, dtype=np.float64)[order])
+    np.save(out_dir / "video_idx.npy", np.asarray(video_idx, dtype=np.int32)[order])
+
+    blob = bytearray()
+    offsets = [0]
+    for i in order:
+        blob += snippets[i].encode("utf-8")
+        offsets.append(len(blob))
+    (out_dir / "snippets.bin").write_bytes(bytes(blob))
+    np.save(out_dir / "snippet_offsets.npy", np.asarray(offsets, dtype=np.int64))
+
+    header = {
+        "version": INDEX_VERSION,
+        "generation": index.generation,
+        "model": EMBED_MODEL,
+        "window": WINDOW,
+        "stride": STRIDE,
+        "count": int(n),
+        "videos": index.videos,
+    }
+    (out_dir / "header.json").write_text(json.dumps(header, ensure_ascii=False), encoding="utf-8")
+    return out_dir
+
+
+class SemanticIndex:
+    """Memory-mapped int8 passage vectors grouped by coarse cluster."""
+
+    def __init__(self, directory: Path):
+        self.header: Dict[str, Any] = json.loads((directory / "header.json").read_text(encoding="utf-8"))
+        self.generation: str = self.header["generation"]
+        self.videos: List[str] = self.header["videos"]
+
+        self.vectors = np.load(directory / "vectors.npy", mmap_mode="r")
+        self.centroids = np.load(directory / "centroids.npy")
+        self.list_offsets = np.load(directory / "list_offsets.npy")
+        self.starts = np.load(directory / "starts.npy", mmap_mode="r")
+        self.video_idx = np.load(directory / "video_idx.npy", mmap_mode="r")
+        self.snippet_offsets = np.load(directory / "snippet_offsets.npy", mmap_mode="r")
+        self.snippets = np.memmap(directory / "snippets.bin", dtype=np.uint8, mode="r") \
+            if (directory / "snippets.bin").stat().st_size else np.zeros(0, dtype=np.uint8)
+
+    @classmethod
+    def open(cls, directory: Path) -> Optional["SemanticIndex"]:
+        try:
+            index = cls(directory)
+        except (OSError, ValueError, KeyError):
+            return None
+
+        if index.header.get("version") != INDEX_VERSION or index.header.get("model") != EMBED_MODEL:
+            return None
+        return index
+
+    def snippet(self, i: int) -> str:
+        return bytes(self.snippets[self.snippet_offsets[i]:self.snippet_offsets[i + 1]]).decode("utf-8")
+
+    def query(self, text: str, k: int = 50, nprobe: int = NPROBE) -> List[Tuple[int, float]]:
+        """Returns (passage, cosine score) pairs, best first."""
+        if not len(self.vectors):
+            return []
+
+        q = embed([text])[0]
+        probes = np.argsort(self.centroids @ q)[::-1][:nprobe]
+
+        candidates = []
+        scores = []
+        for c in probes:
+            lo, hi = int(self.list_offsets[c]), int(self.list_offsets[c + 1])
+            if lo == hi:
+                continue
+            candidates.append(np.arange(lo, hi))
+            scores.append(self.vectors[lo:hi].astype(np.float32) @ q / 127)
+
+        if not candidates:
+            return []
+
+        ids = np.concatenate(candidates)
+        sc = np.concatenate(scores)
+        top = np.argsort(sc)[::-1][:k]
+        return [(int(ids[i]), float(sc[i])) for i in top]
@@ -0,0 +1,134 @@
+import gzip
+import json
+import os
+import sys
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+
+# preferred first; plain .json is what older runs wrote
+SUFFIXES = (".json.zst", ".json.gz", ".json")
+
+ZSTD_LEVEL = 10
+GZIP_LEVEL = 6
+
+# audio is only needed until Whisper has produced a final transcript
+KEEP_AUDIO = False
+
+
+def data_dir() -> Path:
+    """Root of everything the pipeline and the search write; YT_SEARCH_DATA_DIR
+    moves all of it at once."""
+    override = os.environ.get("YT_SEARCH_DATA_DIR")
+    return Path(override) if override else Path(__file__).resolve().parents[2] / "data"
+
+
+def video_id_of(path: Path) -> str:
+    name = path.name
+    for suf in SUFFIXES:
+        if name.endswith(suf):
+            return name[:-len(suf)]
+    return path.stem
+
+
+def transcript_file(directory: Path, video_id: str) -> Optional[Path]:
+    for suf in SUFFIXES:
+        p = directory / f"{video_id}{suf}"
+        if p.exists():
+            return p
+    return None
+
+
+def iter_transcript_files(directory: Path) -> List[Path]:
+    """One file per video, sorted by video id, preferring compressed copies."""
+    if not directory.exists():
+        return []
+
+    chosen: Dict[str, Path] = {}
+    for suf in reversed(SUFFIXES):
+        for p in directory.glob(f"*{suf}"):
+            chosen[video_id_of(p)] = p
+
+    return [chosen[k] for k in sorted(chosen)]
+
+
+def encode(data: Any) -> tuple[bytes, str]:
+    raw = json.dumps(data, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+
+    if zstandard is not None:
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(raw), ".json.zst"
+
+    return gzip.compress(raw, compresslevel=GZIP_LEVEL, mtime=0), ".json.gz"
+
+
+def decode(path: Path, blob: bytes) -> Any:
+    name = path.name
+    if name.endswith(".json.zst"):
+        if zstandard is None:
+            raise RuntimeError(f"zstandard is not installed, cannot read {name}")
+        blob = zstandard.ZstdDecompressor().decompress(blob)
+    elif name.endswith(".json.gz"):
+        blob = gzip.decompress(blob)
+
+    return json.loads(blob)
+
+
+def read_transcript(path: Path) -> Any:
+    return decode(path, path.read_bytes())
+
+
+def write_transcript(directory: Path, video_id: str, data: Any) -> Path:
+    directory.mkdir(parents=True, exist_ok=True)
+    blob, suffix = encode(data)
+    out_path = directory / f"{video_id}{suffix}"
+
+    tmp = out_path.with_name(out_path.name + ".tmp")
+    tmp.write_bytes(blob)
+    tmp.replace(out_path)
+
+    for suf in SUFFIXES:
+        stale = directory / f"{video_id}{suf}"
+        if suf != suffix and stale.exists():
+            stale.unlink()
+
+    return out_path
+
+
+def evict_audio(audio_dir: Path, video_id: str) -> bool:
+    if KEEP_AUDIO:
+        return False
+
+    removed = False
+    for p in audio_dir.glob(f"{video_id}.*"):
+        p.unlink()
+        removed = True
+    return removed
+
+
+def compact_transcripts(directory: Path) -> tuple[int, int, int]:
+    """Rewrites plain .json transcripts compressed. Returns (files, bytes before, bytes after)."""
+    count = before = after = 0
+
+    for p in iter_transcript_files(directory):
+        if p.suffix != ".json":
+            continue
+
+        size = p.stat().st_size
+        out = write_transcript(directory, video_id_of(p), read_transcript(p))
+        count += 1
+        before += size
+        after += out.stat().st_size
+
+    return count, before, after
+
+
+if __name__ == "__main__":
+    target = Path(sys.argv[1]) if len(sys.argv) > 1 else data_dir() / "transcripts"
+
+    n, before, after = compact_transcripts(target)
+    print(f"Compacted {n} transcripts: {before / 1e6:.1f} MB -> {after / 1e6:.1f} MB")
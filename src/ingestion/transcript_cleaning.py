@@ -0,0 +1,140 @@
+import re
+from typing import Any, Dict, List
+
+
+# same thresholds transcribe_audio passes to Whisper
+NO_SPEECH_THRESHOLD = 0.6
+LOGPROB_THRESHOLD = -1.0
+COMPRESSION_RATIO_THRESHOLD = 2.4
+
+# below this a segment is dropped even when Whisper thinks there is speech
+MIN_AVG_LOGPROB = -1.5
+
+# a hallucination loop repeats the same line, possibly with others between
+LOOP_WINDOW = 4
+LOOP_MIN_KEY_LEN = 12
+
+# short caption lines ("da", "ne ne") repeat in real speech, so they only
+# count as duplicates when they overlap the previous line in time
+DUPLICATE_MIN_KEY_LEN = 12
+
+_NON_WORD = re.compile(r"\W+")
+
+
+def _key(text: str) -> str:
+    return _NON_WORD.sub(" ", text.casefold()).strip()
+
+
+def _overlap(prev_words: List[str], cur_words: List[str]) -> int:
+    """Number of leading words of cur that repeat the tail of prev."""
+    for n in range(min(len(prev_words), len(cur_words)), 0, -1):
+        if prev_words[-n:] == cur_words[:n]:
+            return n
+    return 0
+
+
+def clean_youtube_items(items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Collapses the duplicated and rolling lines of YouTube auto captions."""
+    out: List[Dict[str, Any]] = []
+    keys: List[str] = []
+
+    for it in items:
+        text = (it.get("text") or "").strip()
+        key = _key(text)
+        if not key:
+            continue
+
+        start = float(it.get("start") or 0.0)
+        end = start + float(it.get("duration") or 0.0)
+
+        if out:
+            prev = out[-1]
+            prev_words = keys[-1].split()
+            cur_words = key.split()
+            n = len(cur_words)
+            prev_start = float(prev.get("start") or 0.0)
+            prev_end = prev_start + float(prev.get("duration") or 0.0)
+
+            # repeated line, or a line the previous one already contains
+            duplicate = prev_words[:n] == cur_words or prev_words[-n:] == cur_words
+            if duplicate and (len(key) >= DUPLICATE_MIN_KEY_LEN or start < prev_end):
+                prev["duration"] = round(max(prev_end, end) - prev_start, 3)
+                continue
+
+            # rolling caption that grows the previous line while it is shown
+            rolling = len(cur_words) > len(prev_words) and cur_words[:len(prev_words)] == prev_words
+            if rolling and start < prev_end:
+                prev["text"] = text
+                prev["duration"] = round(max(prev_end, end) - prev_start, 3)
+                keys[-1] = key
+                continue
+
+            # the next line repeats the tail of this one; keep the full key
+            # so that a following duplicate still matches it
+            words = text.split()
+            overlap = _overlap(prev_words, [_key(w) for w in words])
+            if overlap >= 2:
+                text = " ".join(words[overlap:])
+                if not _key(text):
+                    prev["duration"] = round(max(prev_end, end) - prev_start, 3)
+                    continue
+
+        out.append({**it, "text": text})
+        keys.append(key)
+
+    return out
+
+
+def _is_junk(seg: Dict[str, Any]) -> bool:
+    no_speech = seg.get("no_speech_prob")
+    logprob = seg.get("avg_logprob")
+    ratio = seg.get("compression_ratio")
+
+    if no_speech is not None and logprob is not None:
+        if no_speech > NO_SPEECH_THRESHOLD and logprob < LOGPROB_THRESHOLD:
+            return True
+
+    if logprob is not None and logprob < MIN_AVG_LOGPROB:
+        return True
+
+    if ratio is not None and ratio > COMPRESSION_RATIO_THRESHOLD:
+        return True
+
+    return False
+
+
+def clean_whisper_segments(segments: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Drops no-speech / low confidence segments and collapses repetition loops."""
+    out: List[Dict[str, Any]] = []
+    keys: List[str] = []
+
+    for seg in segments:
+        text = (seg.get("text") or "").strip()
+        key = _key(text)
+        if not key or _is_junk(seg):
+            continue
+
+        if out and key == keys[-1]:
+            prev = out[-1]
+            prev["end"] = max(prev.get("end") or 0.0, seg.get("end") or 0.0)
+            if seg.get("words"):
+                prev["words"] = (prev.get("words") or []) + seg["words"]
+            continue
+
+        if len(key) >= LOOP_MIN_KEY_LEN and key in keys[-LOOP_WINDOW:]:
+            continue
+
+        out.append({**seg, "text": text})
+        keys.append(key)
+
+    return out
+
+
+def clean_transcript(data: Any) -> Any:
+    if isinstance(data, list):
+        return clean_youtube_items(data)
+
+    if isinstance(data, dict) and isinstance(data.get("segments"), list):
+        return {**data, "segments": clean_whisper_segments(data["segments"])}
+
+    return data
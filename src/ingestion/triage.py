@@ -0,0 +1,210 @@
+import json
+import subprocess
+import tempfile
+from collections import Counter
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+
+import storage
+from video_transcription import fetch_chosen_transcript
+from transcript_cleaning import NO_SPEECH_THRESHOLD
+from metrics import inc, timer
+
+
+# Whisper and YouTube often label Serbian speech as Croatian or Bosnian
+SR_FAMILY = ("sr", "hr", "bs", "sh")
+
+PROBE_MODEL = "tiny"
+PROBE_SECONDS = 30
+PROBE_SAMPLES = 3
+# the tiny model on a few samples often hears Serbian as mk, sl, ru or bg,
+# so the full run only leaves Serbian for a language it is sure about
+LANGUAGE_MIN_PROB = 0.8
+
+_PROBE_MODEL = None
+
+
+def triage_file() -> Path:
+    return storage.data_dir() / "triage" / "triage.json"
+
+
+def load_triage() -> Dict[str, Dict[str, Any]]:
+    try:
+        return json.loads(triage_file().read_text(encoding="utf-8"))
+    except Exception:
+        return {}
+
+
+def save_triage(triage: Dict[str, Dict[str, Any]]) -> None:
+    path = triage_file()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(triage, ensure_ascii=False, indent=2), encoding="utf-8")
+    tmp.replace(path)
+
+
+def base_language(code: str) -> str:
+    return (code or "").split("-")[0].lower()
+
+
+def is_serbian(code: str) -> bool:
+    return base_language(code) in SR_FAMILY
+
+
+def choose_track(tracks: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Cheapest usable caption track, or None when only audio can tell.
+
+    Serbian tracks win, manual before generated. Otherwise a generated track
+    tells which language is actually spoken, and the manual track in that
+    language (or the generated one) is used. Manual tracks in another
+    language alone may just be translations, so those wait for the probe."""
+    serbian = [t for t in tracks if is_serbian(t["language_code"])]
+    if serbian:
+        return min(serbian, key=lambda t: (t["generated"], base_language(t["language_code"]) != "sr"))
+
+    spoken = [t for t in tracks if t["generated"]]
+    if spoken:
+        return track_for_language(tracks, spoken[0]["language_code"]) or spoken[0]
+
+    return None
+
+
+def track_for_language(tracks: List[Dict[str, Any]], language: str) -> Optional[Dict[str, Any]]:
+    lang = base_language(language)
+    same = [
+        t for t in tracks
+        if base_language(t["language_code"]) == lang or (is_serbian(language) and is_serbian(t["language_code"]))
+    ]
+    return min(same, key=lambda t: t["generated"]) if same else None
+
+
+def triage_videos(
+    video_ids: List[str],
+    triage: Dict[str, Dict[str, Any]],
+    progress: Callable[[int, int], None] = lambda done, total: None,
+) -> Tuple[Optional[str], Set[str]]:
+    """Lists the caption tracks of every video not triaged yet and saves the
+    cheapest usable one in the same request; videos left without a track
+    go to audio. Returns (video id of an IP block or None, saved ids)."""
+    saved: Set[str] = set()
+
+    for i, vid in enumerate(video_ids):
+        progress(i, len(video_ids))
+        if "tracks" in triage.get(vid, {}):
+            continue
+
+        with timer("pipeline_transcript_fetch_seconds"):
+            tracks, track, status, _ = fetch_chosen_transcript(vid, choose_track)
+        inc("pipeline_transcript_fetch_total", status=status)
+        print(f"{vid}: triage -> {status}" + (f" ({track['language_code']})" if track else ""))
+
+        if status == "ip_blocked":
+            return vid, saved
+        if tracks is None:
+            continue
+
+        if track is not None:
+            saved.add(vid)
+
+        entry = triage.setdefault(vid, {})
+        entry["tracks"] = tracks
+        entry["source"] = "youtube" if track else "audio"
+        entry["track"] = track
+        save_triage(triage)
+
+    progress(len(video_ids), len(video_ids))
+    return None, saved
+
+
+def _duration(path: Path) -> Optional[float]:
+    cmd = ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "csv=p=0", str(path)]
+    try:
+        r = subprocess.run(cmd, capture_output=True, text=True)
+        return float(r.stdout.strip())
+    except Exception:
+        return None
+
+
+def sample_offsets(duration: Optional[float]) -> List[float]:
+    if not duration or duration <= PROBE_SECONDS * PROBE_SAMPLES:
+        return [0.0]
+
+    # skip intros and outros, which are often music
+    return [
+        max(0.0, duration * (i + 1) / (PROBE_SAMPLES + 1) - PROBE_SECONDS / 2)
+        for i in range(PROBE_SAMPLES)
+    ]
+
+
+def _cut_sample(src: Path, dst: Path, offset: float) -> None:
+    cmd = [
+        "ffmpeg", "-y",
+        "-ss", f"{offset:.1f}",
+        "-t", str(PROBE_SECONDS),
+        "-i", str(src),
+        "-ac", "1",
+        "-ar", "16000",
+        str(dst),
+    ]
+    r = subprocess.run(cmd, capture_output=True, text=True)
+    if r.returncode != 0:
+        raise RuntimeError((r.stderr or "").strip() or "ffmpeg sample failed")
+
+
+def load_probe_model():
+    global _PROBE_MODEL
+    if _PROBE_MODEL is None:
+        import whisper
+
+        with timer("pipeline_whisper_model_load_seconds", model=PROBE_MODEL):
+            _PROBE_MODEL = whisper.load_model(PROBE_MODEL)
+    return _PROBE_MODEL
+
+
+def probe_audio(audio_path: Path) -> Dict[str, Any]:
+    """Detects language and speech on a few short samples with the tiny
+    model, decoded as one batch."""
+    import torch
+    import whisper
+
+    model = load_probe_model()
+
+    with tempfile.TemporaryDirectory() as tmpdir:
+        mels = []
+        for i, offset in enumerate(sample_offsets(_duration(audio_path))):
+            wav = Path(tmpdir) / f"sample{i}.wav"
+            _cut_sample(audio_path, wav, offset)
+            audio = whisper.pad_or_trim(whisper.load_audio(str(wav)))
+            mels.append(whisper.log_mel_spectrogram(audio, model.dims.n_mels))
+
+    options = whisper.DecodingOptions(fp16=False, without_timestamps=True)
+    with timer("pipeline_probe_seconds"):
+        results = whisper.decode(model, torch.stack(mels).to(model.device), options)
+
+    speech = [r for r in results if r.no_speech_prob < NO_SPEECH_THRESHOLD and r.text.strip()]
+
+    # language probabilities averaged over the samples with speech
+    probs: Counter = Counter()
+    for r in speech:
+        probs.update(r.language_probs or {r.language: 1.0})
+    language, score = probs.most_common(1)[0] if speech else (None, 0.0)
+
+    return {
+        "speech": bool(speech),
+        "language": language,
+        "language_prob": round(score / max(len(speech), 1), 3),
+        "no_speech_prob": round(min(r.no_speech_prob for r in results), 3),
+    }
+
+
+def spoken_language(probe: Dict[str, Any]) -> Optional[str]:
+    """Language of the probe when it is confident enough, otherwise None."""
+    if (probe.get("language_prob") or 0.0) < LANGUAGE_MIN_PROB:
+        return None
+    return probe.get("language")
+
+
+def whisper_language(language: Optional[str]) -> str:
+    if not language or is_serbian(language):
+        return "sr"
+    return language
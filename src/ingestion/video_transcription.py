@@ -1,11 +1,13 @@
-import json
 import time
 import random
 from pathlib import Path
-from typing import Literal, Tuple
+from typing import Any, Callable, Dict, List, Literal, Tuple, TypeVar
 
 from youtube_transcript_api import YouTubeTranscriptApi
 
+import storage
+from metrics import inc, timer
+
 SR_LANGS = ["sr", "sr-Latn", "sr-Cyrl"]
 
 _NEXT_ALLOWED_TS = 0.0
@@ -14,63 +16,111 @@ def _polite_wait(min_s: float = 7.0, max_s: float = 12.0) -> None:
     global _NEXT_ALLOWED_TS
     now = time.time()
     if now < _NEXT_ALLOWED_TS:
-        time.sleep(_NEXT_ALLOWED_TS - now)
+        with timer("pipeline_sleep_seconds", source="polite_wait"):
+            time.sleep(_NEXT_ALLOWED_TS - now)
     _NEXT_ALLOWED_TS = time.time() + random.uniform(min_s, max_s)
 
-Status = Literal["saved", "cached", "no_transcript", "rate_limited", "ip_blocked", "error"]
+Status = Literal["saved", "cached", "listed", "no_transcript", "rate_limited", "ip_blocked", "error"]
 
-def try_download_transcript(video_id: str) -> Tuple[bool, Status, str | None]:
-    repo_root = Path(__file__).resolve().parents[2]
-    out_dir = repo_root / "data" / "transcripts"
-    out_dir.mkdir(parents=True, exist_ok=True)
-    out_path = out_dir / f"{video_id}.json"
+T = TypeVar("T")
 
-    if out_path.exists():
-        return True, "cached", None
-
-    api = YouTubeTranscriptApi()
 
+def _with_backoff(video_id: str, call: Callable[[], T]) -> Tuple[T | None, Status, str | None]:
     delay = 30.0
 
     for attempt in range(1, 6):
         try:
             _polite_wait(7, 12)
-
-            fetched = api.fetch(video_id, languages=SR_LANGS)
-            data = fetched.to_raw_data()
-
-            out_path.write_text(
-                json.dumps(data, ensure_ascii=False, indent=2),
-                encoding="utf-8"
-            )
-
-            print(f"Transcript saved: {out_path.name}")
-            return True, "saved", None
+            return call(), "saved", None
 
         except Exception as e:
             msg = str(e)
             msg_l = msg.lower()
 
-            if "notranscriptfound" in msg_l or "no transcript" in msg_l:
+            if "notranscriptfound" in msg_l or "no transcript" in msg_l or "disabled" in msg_l:
                 print(f"No transcript for {video_id}")
-                return False, "no_transcript", msg
+                return None, "no_transcript", msg
 
             if "429" in msg_l or "too many requests" in msg_l:
                 sleep_s = delay + random.uniform(0, 5)
                 print(f"429 rate limit for {video_id}. Sleep {sleep_s:.1f}s (attempt {attempt}/5)")
-                time.sleep(sleep_s)
+                inc("pipeline_rate_limited_total")
+                with timer("pipeline_sleep_seconds", source="rate_limit"):
+                    time.sleep(sleep_s)
                 delay = min(delay * 2, 20 * 60)
                 continue
 
             if "ipblocked" in msg_l or "requestblocked" in msg_l or "blocking requests from your ip" in msg_l:
                 print(f"IP BLOCKED for {video_id}. Stop run and try later / change IP.")
-                return False, "ip_blocked", msg
+                return None, "ip_blocked", msg
 
             print(f"Transcript failed: {type(e).__name__}")
-            return False, "error", msg
+            return None, "error", msg
 
     print("Transcript retries exceeded.")
-    return False, "rate_limited", "retries exceeded"
+    return None, "rate_limited", "retries exceeded"
+
+
+def try_download_transcript(video_id: str, languages: List[str] | None = None) -> Tuple[bool, Status, str | None]:
+    out_dir = storage.data_dir() / "transcripts"
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    if storage.transcript_file(out_dir, video_id) is not None:
+        return True, "cached", None
+
+    api = YouTubeTranscriptApi()
+
+    def fetch() -> Path:
+        fetched = api.fetch(video_id, languages=languages or SR_LANGS)
+        # stored as fetched; cleaning happens when the index is built
+        return storage.write_transcript(out_dir, video_id, fetched.to_raw_data())
+
+    out_path, status, err = _with_backoff(video_id, fetch)
+    if out_path is None:
+        return False, status, err
+
+    print(f"Transcript saved: {out_path.name}")
+    return True, "saved", None
+
+
+Track = Dict[str, Any]
+
+
+def fetch_chosen_transcript(
+    video_id: str,
+    choose: Callable[[List[Track]], Track | None],
+) -> Tuple[List[Track] | None, Track | None, Status, str | None]:
+    """Lists the caption tracks of the video and saves the one choose()
+    picks, fetched from that same listing. Returns (tracks, chosen track,
+    status, error); status is "listed" when choose() picked nothing."""
+    out_dir = storage.data_dir() / "transcripts"
+    out_dir.mkdir(parents=True, exist_ok=True)
+    api = YouTubeTranscriptApi()
+
+    def list_and_fetch() -> Tuple[List[Track], Track | None]:
+        transcripts = list(api.list(video_id))
+        tracks = [
+            {
+                "language_code": t.language_code,
+                "language": t.language,
+                "generated": bool(t.is_generated),
+            }
+            for t in transcripts
+        ]
+        track = choose(tracks)
+        if track is not None:
+            fetched = transcripts[tracks.index(track)].fetch()
+            out_path = storage.write_transcript(out_dir, video_id, fetched.to_raw_data())
+            print(f"Transcript saved: {out_path.name} ({track['language_code']})")
+        return tracks, track
+
+    result, status, err = _with_backoff(video_id, list_and_fetch)
+    if result is not None:
+        tracks, track = result
+        return tracks, track, "saved" if track else "listed", None
+    if status == "no_transcript":
+        return [], None, status, err
+    return None, None, status, err
 
 if __name__ == "__main__":
     import sys
@@ -1,37 +1,28 @@
 # whisper_transcription.py
 from __future__ import annotations
 
-import json
 import subprocess
 import tempfile
 from pathlib import Path
 from typing import Any, Dict, Optional
 
-import whisper
-
-def _project_root() -> Path:
-
-    return Path(__file__).resolve().parents[2]
-
-
-def _data_dir() -> Path:
-    return _project_root() / "data"
-
+import storage
+from metrics import timer
 
 def _audio_dir() -> Path:
-    p = _data_dir() / "audio"
+    p = storage.data_dir() / "audio"
     p.mkdir(parents=True, exist_ok=True)
     return p
 
 
 def _transcripts_dir() -> Path:
-    p = _data_dir() / "transcripts"
+    p = storage.data_dir() / "transcripts"
     p.mkdir(parents=True, exist_ok=True)
     return p
 
-def _write_json(path: Path, data: Any) -> None:
-    path.parent.mkdir(parents=True, exist_ok=True)
-    path.write_text(json.dumps(data, ensure_ascii=False, indent=2), encoding="utf-8")
+def _compact_segments(segments: list[dict]) -> list[dict]:
+    # token ids are only useful for decoding, the search never reads them
+    return [{k: v for k, v in seg.items() if k != "tokens"} for seg in segments]
 
 
 def _run_ffmpeg_to_wav_16k_mono(src: Path, dst: Path) -> None:
@@ -54,10 +45,10 @@ def transcribe_audio(
     use_word_timestamps: bool = True,
 ) -> bool:
     audio_mp3 = _audio_dir() / f"{video_id}.mp3"
-    out_path = _transcripts_dir() / f"{video_id}.json"
 
-    if out_path.exists():
-        print(f"Cached transcript: {out_path.name}")
+    cached = storage.transcript_file(_transcripts_dir(), video_id)
+    if cached is not None:
+        print(f"Cached transcript: {cached.name}")
         return True
 
     if not audio_mp3.exists():
@@ -70,7 +61,8 @@ def transcribe_audio(
         tmp_wav = Path(tmpdir) / f"{video_id}.wav"
 
         try:
-            _run_ffmpeg_to_wav_16k_mono(audio_mp3, tmp_wav)
+            with timer("pipeline_ffmpeg_seconds"):
+                _run_ffmpeg_to_wav_16k_mono(audio_mp3, tmp_wav)
         except Exception as e:
             print(f"ffmpeg failed: {e}")
             return False
@@ -78,7 +70,11 @@ def transcribe_audio(
         print(f"Whisper ({model_name}, lang={language}) -> {audio_mp3.name}")
 
         try:
-            model = whisper.load_model(model_name)
+            # whisper pulls in torch; import it only when a transcription runs
+            import whisper
+
+            with timer("pipeline_whisper_model_load_seconds", model=model_name):
+                model = whisper.load_model(model_name)
         except Exception as e:
             print(f"Whisper model load failed: {type(e).__name__}: {e}")
             return False
@@ -101,7 +97,8 @@ def transcribe_audio(
             transcribe_kwargs["word_timestamps"] = True
 
         try:
-            result = model.transcribe(str(tmp_wav), **transcribe_kwargs)
+            with timer("pipeline_whisper_seconds", model=model_name):
+                result = model.transcribe(str(tmp_wav), **transcribe_kwargs)
         except TypeError as e:
             if "word_timestamps" in str(e):
                 transcribe_kwargs.pop("word_timestamps", None)
@@ -126,11 +123,11 @@ def transcribe_audio(
             "mp3": str(audio_mp3),
         },
         "text": (result.get("text") or "").strip(),
-        "segments": result.get("segments", []),
+        "segments": _compact_segments(result.get("segments", [])),
     }
 
     try:
-        _write_json(out_path, payload)
+        out_path = storage.write_transcript(_transcripts_dir(), video_id, payload)
     except Exception as e:
         print(f"Failed to write transcript JSON: {type(e).__name__}: {e}")
         return False
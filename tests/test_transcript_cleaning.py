@@ -0,0 +1,45 @@
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parents[1] / "src" / "ingestion"))
+
+from transcript_cleaning import clean_youtube_items
+
+
+def item(text, start, duration=2.0):
+    return {"text": text, "start": start, "duration": duration}
+
+
+def texts(items):
+    return [it["text"] for it in items]
+
+
+def test_short_line_after_longer_one_is_kept():
+    out = clean_youtube_items([item("rekao je da", 0.0), item("da", 5.0)])
+    assert texts(out) == ["rekao je da", "da"]
+
+
+def test_repeated_short_lines_are_kept():
+    out = clean_youtube_items([item("ne ne", 0.0), item("ne", 3.0), item("ne ne", 6.0)])
+    assert texts(out) == ["ne ne", "ne", "ne ne"]
+
+    out = clean_youtube_items([item("da", 7.0, 1.0), item("da", 9.0, 1.0)])
+    assert texts(out) == ["da", "da"]
+    assert out[0]["duration"] == 1.0
+
+
+def test_far_apart_repeat_is_kept():
+    out = clean_youtube_items([item("hvala", 0.0, 1.0), item("hvala", 300.0, 1.0)])
+    assert texts(out) == ["hvala", "hvala"]
+    assert [it["start"] for it in out] == [0.0, 300.0]
+    assert out[0]["duration"] == 1.0
+
+
+def test_overlapping_duplicate_and_rolling_lines_collapse():
+    out = clean_youtube_items([item("da", 0.0), item("da", 1.0)])
+    assert texts(out) == ["da"]
+    assert out[0]["duration"] == 3.0
+
+    out = clean_youtube_items([item("dobar dan", 0.0), item("dobar dan svima", 1.0)])
+    assert texts(out) == ["dobar dan svima"]
+    assert out[0]["duration"] == 3.0